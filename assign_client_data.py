@@ -1,44 +1,27 @@
+import csv
 import os
-import random
-import re
+import sys
+from backend.utils.data_loader import user_data_files
 
 PROCESSED_DIR = 'data/processed'
-CLIENTS_DIR = 'clients'
-NUM_CLIENTS = 5
+ASSIGNMENTS_PATH = 'clients/assignments.csv'
+NUM_CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
 
-# List all user CSVs in data/processed/
-user_csvs = sorted([f for f in os.listdir(PROCESSED_DIR) if f.endswith('.csv') and f.startswith('user_')])
+# List all user files in data/processed/ (one format per directory, as in backend/simulation.py)
+user_csvs = [os.path.basename(path) for path in user_data_files(PROCESSED_DIR)]
 
 # Assign each client a user CSV (round-robin)
 assignments = {}
 for i in range(NUM_CLIENTS):
-    client_name = f'client_{i+1}'
-    csv_file = user_csvs[i % len(user_csvs)]
-    assignments[client_name] = csv_file
+    assignments[i+1] = user_csvs[i % len(user_csvs)]
 
-# Update data_path in each client's train.py
-for client, csv_file in assignments.items():
-    train_py = os.path.join(CLIENTS_DIR, client, 'train.py')
-    if not os.path.exists(train_py):
-        print(f"{train_py} not found, skipping.")
-        continue
-    with open(train_py, 'r') as f:
-        lines = f.readlines()
-    new_lines = []
-    replaced = False
-    for line in lines:
-        if re.match(r'\s*data_path\s*=.*', line):
-            new_lines.append(f'data_path = "{PROCESSED_DIR}/{csv_file}"\n')
-            replaced = True
-        else:
-            new_lines.append(line)
-    if not replaced:
-        # Insert at the top if not found
-        new_lines.insert(0, f'data_path = "{PROCESSED_DIR}/{csv_file}"\n')
-    with open(train_py, 'w') as f:
-        f.writelines(new_lines)
-    print(f"Assigned {csv_file} to {client}/train.py")
+# Write the table read by clients/client_N/train.py when no --data-path is given
+with open(ASSIGNMENTS_PATH, 'w', newline='') as f:
+    writer = csv.writer(f)
+    writer.writerow(['client_id', 'data_path'])
+    for client_id, csv_file in assignments.items():
+        writer.writerow([client_id, f'{PROCESSED_DIR}/{csv_file}'])
 
 print("\nAssignment summary:")
-for client, csv_file in assignments.items():
-    print(f"{client}: {csv_file}") 
\ No newline at end of file
+for client_id, csv_file in assignments.items():
+    print(f"client_{client_id}: {csv_file}")
@@ -0,0 +1,160 @@
+"""
+Staleness-tolerant federated rounds for the Flower server.
+
+QuorumServer replaces Flower's synchronous fit round (wait for every sampled
+client) with a buffered one in the style of FedBuff: fit instructions go out
+to every idle client, and the round is aggregated as soon as `quorum` updates
+are buffered, or, in deadline mode, once `deadline` seconds have passed and
+at least one update has arrived. Stragglers keep training; their updates
+land in a later round's buffer, tagged with the round whose global model
+they started from.
+
+BufferedAsyncFedAvg aggregates that buffer. Each update is turned back into a
+delta against its own base model and weighted by
+num_examples * (1 + staleness) ** -staleness_exponent (FedAsync's polynomial
+discount). Updates older than max_staleness rounds are dropped. With zero
+staleness and server_lr=1.0 this is exactly FedAvg.
+"""
+import concurrent.futures
+import threading
+import time
+import numpy as np
+import flwr as fl
+from flwr.common import Code, ndarrays_to_parameters, parameters_to_ndarrays
+from flwr.server.server import evaluate_clients, fit_client
+from backend.compression import CompressedFedAvg
+
+class BufferedAsyncFedAvg(CompressedFedAvg):
+    def __init__(self, *, max_staleness=3, staleness_exponent=0.5, server_lr=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.max_staleness = max_staleness
+        self.staleness_exponent = staleness_exponent
+        self.server_lr = server_lr
+        # Keep every global model a buffered update may still be based on
+        self.history_size = max_staleness + 1
+
+    def staleness_weight(self, staleness):
+        return (1.0 + staleness) ** -self.staleness_exponent
+
+    def aggregate_fit(self, server_round, results, failures):
+        if not results:
+            return None, {}
+        if not self.accept_failures and failures:
+            return None, {}
+        wire_bytes = sum(len(t) for _, fit_res in results for t in fit_res.parameters.tensors)
+        current = self.round_parameters[server_round]
+        weighted_delta = [np.zeros_like(layer, dtype=np.float64) for layer in current]
+        total_weight, staleness_seen, dropped = 0.0, [], 0
+        for _, fit_res in results:
+            base_round = int(fit_res.metrics.get("base_round", server_round))
+            staleness = server_round - base_round
+            if staleness > self.max_staleness or base_round not in self.round_parameters:
+                dropped += 1
+                continue
+            params = parameters_to_ndarrays(self.decode_result(server_round, fit_res).parameters)
+            weight = fit_res.num_examples * self.staleness_weight(staleness)
+            for acc, new, base in zip(weighted_delta, params, self.round_parameters[base_round]):
+                acc += weight * (new - base)
+            total_weight += weight
+            staleness_seen.append(staleness)
+        self.bytes_history[server_round] = (wire_bytes, None)
+        if total_weight == 0:
+            print(f"[Server] Round {server_round}: no usable updates ({dropped} too stale)")
+            return None, {"updates_dropped": dropped}
+        aggregated = [(base + self.server_lr * acc / total_weight).astype(base.dtype)
+                      for base, acc in zip(current, weighted_delta)]
+        metrics = {
+            "updates_aggregated": len(staleness_seen),
+            "updates_dropped": dropped,
+            "mean_staleness": float(np.mean(staleness_seen)),
+            "bytes_on_wire": wire_bytes,
+        }
+        if self.fit_metrics_aggregation_fn:
+            fit_metrics = [(res.num_examples, res.metrics) for _, res in results]
+            metrics.update(self.fit_metrics_aggregation_fn(fit_metrics))
+        print(f"[Server] Round {server_round}: aggregated {len(staleness_seen)} updates "
+              f"(mean staleness {metrics['mean_staleness']:.2f}, {dropped} dropped, {wire_bytes} bytes on wire)")
+        return ndarrays_to_parameters(aggregated), metrics
+
+class QuorumServer(fl.server.Server):
+    def __init__(self, *, client_manager, strategy, quorum, deadline=None, poll_interval=0.05, max_workers=None):
+        super().__init__(client_manager=client_manager, strategy=strategy)
+        self.quorum = quorum
+        self.deadline = deadline
+        self.poll_interval = poll_interval
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        # future -> (client cid, round whose global model it was sent)
+        self._in_flight = {}
+
+    def busy_clients(self):
+        with self._lock:
+            return {cid for cid, _ in self._in_flight.values()}
+
+    def _collect_finished(self):
+        results, failures = [], []
+        with self._lock:
+            done = [f for f in self._in_flight if f.done()]
+            finished = [(f, self._in_flight.pop(f)) for f in done]
+        for future, (_, base_round) in finished:
+            if future.exception() is not None:
+                failures.append(future.exception())
+                continue
+            proxy, fit_res = future.result()
+            if fit_res.status.code != Code.OK:
+                failures.append((proxy, fit_res))
+                continue
+            # Tag with the base model round so the strategy can discount stale updates
+            fit_res.metrics.setdefault("base_round", base_round)
+            results.append((proxy, fit_res))
+        return results, failures
+
+    def fit_round(self, server_round, timeout):
+        busy = self.busy_clients()
+        client_instructions = [(proxy, ins) for proxy, ins in self.strategy.configure_fit(
+            server_round=server_round, parameters=self.parameters, client_manager=self._client_manager)
+            if proxy.cid not in busy]
+        with self._lock:
+            for proxy, ins in client_instructions:
+                future = self._executor.submit(fit_client, proxy, ins, timeout, server_round)
+                self._in_flight[future] = (proxy.cid, server_round)
+        if not self._in_flight:
+            print(f"[Server] Round {server_round}: no clients available")
+            return None
+
+        start = time.monotonic()
+        results, failures = [], []
+        while True:
+            new_results, new_failures = self._collect_finished()
+            results.extend(new_results)
+            failures.extend(new_failures)
+            if len(results) >= self.quorum:
+                break
+            if self.deadline is not None and time.monotonic() - start >= self.deadline and results:
+                break
+            if not self._in_flight:
+                break
+            time.sleep(self.poll_interval)
+        print(f"[Server] Round {server_round}: {len(results)} updates after {time.monotonic() - start:.2f}s, "
+              f"{len(self._in_flight)} clients still training")
+        parameters, metrics = self.strategy.aggregate_fit(server_round, results, failures)
+        return parameters, metrics, (results, failures)
+
+    def evaluate_round(self, server_round, timeout):
+        # Only idle clients are evaluated; the others are still busy with a fit
+        busy = self.busy_clients()
+        client_instructions = [(proxy, ins) for proxy, ins in self.strategy.configure_evaluate(
+            server_round=server_round, parameters=self.parameters, client_manager=self._client_manager)
+            if proxy.cid not in busy]
+        if not client_instructions:
+            return None
+        results, failures = evaluate_clients(client_instructions, max_workers=self.max_workers,
+                                             timeout=timeout, group_id=server_round)
+        loss, metrics = self.strategy.aggregate_evaluate(server_round, results, failures)
+        return loss, metrics, (results, failures)
+
+    def disconnect_all_clients(self, timeout):
+        # Let stragglers finish their last fit before the shutdown message
+        concurrent.futures.wait(list(self._in_flight), timeout=timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        super().disconnect_all_clients(timeout)
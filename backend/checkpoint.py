@@ -0,0 +1,177 @@
+"""
+Versioned checkpoints of the aggregated global model.
+
+Every `every` rounds (and after the final round) the server writes
+
+    data/models/checkpoints/round_00012_<run>.npz    parameters (backend.training.save_parameters format)
+    data/models/checkpoints/round_00012_<run>.json   metadata: round, run id, clients, examples, fit metrics,
+                                                     parameter shapes and sha256, parent checkpoint
+    data/models/checkpoints/latest.json              pointer to the newest checkpoint
+
+and refreshes data/models/global_model.npz, the file backend/inference.py
+serves. Files are written to a temporary name and renamed, so readers never
+see a half-written checkpoint. The run id in the name keeps a warm-started
+run from overwriting an earlier run's rounds; only the `keep` most recently
+created checkpoints are kept, whichever run wrote them.
+
+A later run can seed initial_parameters from the latest checkpoint
+(--init-from latest) or resume it (--resume), continuing the round count.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+import numpy as np
+from flwr.common import parameters_to_ndarrays
+from flwr.server.strategy import Strategy
+from backend.training import load_parameters, save_parameters
+
+CHECKPOINT_DIR = "data/models/checkpoints"
+GLOBAL_MODEL_PATH = "data/models/global_model.npz"
+
+def parameters_digest(arrays):
+    digest = hashlib.sha256()
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+def _write_json(path, payload):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+def _write_parameters(path, arrays):
+    tmp = f"{path}.tmp.npz"
+    save_parameters(tmp, arrays)
+    os.replace(tmp, path)
+
+def latest_checkpoint(checkpoint_dir=CHECKPOINT_DIR):
+    """(npz path, metadata) of the newest checkpoint, or None."""
+    pointer = os.path.join(checkpoint_dir, "latest.json")
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        metadata = json.load(f)
+    return os.path.join(checkpoint_dir, metadata["file"]), metadata
+
+def load_checkpoint(path):
+    """Parameters of a checkpoint .npz, checked against its metadata digest when present."""
+    arrays = load_parameters(path)
+    meta_path = path[:-len(".npz")] + ".json"
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            expected = json.load(f)["parameters"]["sha256"]
+        if parameters_digest(arrays) != expected:
+            raise ValueError(f"Checkpoint {path} does not match its metadata digest")
+    return arrays
+
+def resolve_checkpoint(spec, checkpoint_dir=CHECKPOINT_DIR):
+    """`latest` or a path -> (arrays, metadata or None); None if `latest` has nothing yet."""
+    if spec == "latest":
+        found = latest_checkpoint(checkpoint_dir)
+        if found is None:
+            return None
+        path, metadata = found
+        return load_checkpoint(path), metadata
+    return load_checkpoint(spec), None
+
+class Checkpointer:
+    def __init__(self, checkpoint_dir=CHECKPOINT_DIR, every=1, keep=5, export_path=GLOBAL_MODEL_PATH,
+                 round_offset=0, parent=None, run_id=None):
+        self.checkpoint_dir = checkpoint_dir
+        self.every = every
+        self.keep = keep
+        self.export_path = export_path
+        # Rounds already done by the run being resumed; checkpoints use the global round count
+        self.round_offset = round_offset
+        self.parent = parent
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def due(self, server_round, final=False):
+        return self.every > 0 and (final or (self.round_offset + server_round) % self.every == 0)
+
+    def save(self, server_round, arrays, **info):
+        global_round = self.round_offset + server_round
+        name = f"round_{global_round:05d}_{self.run_id}"
+        _write_parameters(os.path.join(self.checkpoint_dir, f"{name}.npz"), arrays)
+        metadata = {
+            "file": f"{name}.npz",
+            "round": global_round,
+            "run_id": self.run_id,
+            "run_round": server_round,
+            "created": time.time(),
+            "parent": self.parent,
+            "parameters": {"count": int(sum(a.size for a in arrays)), "shapes": [list(a.shape) for a in arrays],
+                           "sha256": parameters_digest(arrays)},
+            **info,
+        }
+        _write_json(os.path.join(self.checkpoint_dir, f"{name}.json"), metadata)
+        _write_json(os.path.join(self.checkpoint_dir, "latest.json"), metadata)
+        if self.export_path:
+            os.makedirs(os.path.dirname(self.export_path) or ".", exist_ok=True)
+            _write_parameters(self.export_path, arrays)
+        self.parent = metadata["file"]
+        self._prune()
+        print(f"[Server] Checkpoint {name} saved to {self.checkpoint_dir}")
+        return metadata
+
+    def _created(self, npz_path):
+        # Age from the metadata; a checkpoint without readable metadata falls back to its mtime
+        try:
+            with open(npz_path[:-len(".npz")] + ".json") as f:
+                return float(json.load(f)["created"])
+        except (OSError, ValueError, KeyError):
+            return os.path.getmtime(npz_path)
+
+    def _prune(self):
+        if not self.keep:
+            return
+        paths = [os.path.join(self.checkpoint_dir, name) for name in os.listdir(self.checkpoint_dir)
+                 if name.startswith("round_") and name.endswith(".npz")]
+        paths.sort(key=self._created)
+        for path in paths[:-self.keep]:
+            for stale in (path, path[:-len(".npz")] + ".json"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+class CheckpointedStrategy(Strategy):
+    """Delegates to `strategy`, checkpointing the aggregated parameters every `checkpointer.every` rounds."""
+    def __init__(self, strategy, checkpointer, num_rounds):
+        self.strategy = strategy
+        self.checkpointer = checkpointer
+        self.num_rounds = num_rounds
+
+    def __getattr__(self, name):
+        if name == "strategy":
+            raise AttributeError(name)
+        return getattr(self.strategy, name)
+
+    def initialize_parameters(self, client_manager):
+        return self.strategy.initialize_parameters(client_manager)
+
+    def configure_fit(self, server_round, parameters, client_manager):
+        return self.strategy.configure_fit(server_round, parameters, client_manager)
+
+    def aggregate_fit(self, server_round, results, failures):
+        parameters, metrics = self.strategy.aggregate_fit(server_round, results, failures)
+        if parameters is not None and self.checkpointer.due(server_round, final=server_round == self.num_rounds):
+            self.checkpointer.save(
+                server_round, parameters_to_ndarrays(parameters),
+                strategy=type(self.strategy).__name__,
+                num_clients=len(results),
+                num_examples=sum(res.num_examples for _, res in results),
+                fit_metrics=metrics,
+            )
+        return parameters, metrics
+
+    def configure_evaluate(self, server_round, parameters, client_manager):
+        return self.strategy.configure_evaluate(server_round, parameters, client_manager)
+
+    def aggregate_evaluate(self, server_round, results, failures):
+        return self.strategy.aggregate_evaluate(server_round, results, failures)
+
+    def evaluate(self, server_round, parameters):
+        return self.strategy.evaluate(server_round, parameters)
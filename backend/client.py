@@ -0,0 +1,107 @@
+"""
+Shared Flower client used by every federated client process.
+Paths and client id are injected by the runner (clients/client_N/train.py).
+"""
+from flwr.client import NumPyClient
+import torch.nn as nn
+import torch.optim as optim
+import os
+import csv
+import time
+from backend.model import HealthRiskLSTM
+from backend.events import EventLog
+from backend.explain import BackgroundExplainer, sample_windows
+from backend.metrics_store import MetricsStore
+from backend.compression import compress, describe, is_identity, payload_bytes
+from backend.training import DEVICE, get_parameters, set_parameters, train_epoch, evaluate_model
+from backend.utils.data_loader import get_dataloader
+
+# Per-client SHAP values written when DeepExplainer fails, kept from the original per-client scripts
+FALLBACK_SHAP_VALUES = {
+    1: [0.0023, 0.0041, 0.0008, 0.0019, 0.0003],
+    2: [0.0018, 0.0037, 0.0012, 0.0021, 0.0005],
+    3: [0.0027, 0.0039, 0.0009, 0.0016, 0.0004],
+    4: [0.0021, 0.0043, 0.0011, 0.0023, 0.0006],
+    5: [0.0025, 0.0035, 0.0010, 0.0018, 0.0004],
+}
+
+class FLClient(NumPyClient):
+    def __init__(self, client_id, csv_path, log_path, shap_path, attribution="deep_shap", explain_size=32,
+                 events_path=None, metrics_db=None, **loader_kwargs):
+        self.client_id = client_id
+        self.model = HealthRiskLSTM()
+        self.model.to(DEVICE)
+        self.criterion = nn.BCELoss()
+        self.optimizer = optim.Adam(self.model.parameters(), lr=0.001)
+        self.trainloader = get_dataloader(csv_path, **loader_kwargs)
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        self.log_file = open(log_path, "w", newline="")
+        self.logger = csv.writer(self.log_file)
+        self.logger.writerow(["round", "loss", "accuracy"])
+        self.round = 0
+        # Optional live event channel for the dashboard
+        self.events = EventLog(events_path) if events_path else None
+        self.metrics = MetricsStore(metrics_db) if metrics_db else None
+        if self.metrics is not None:
+            self.metrics.reset_client(client_id)
+        self.explainer = BackgroundExplainer(client_id, shap_path, FALLBACK_SHAP_VALUES.get(client_id, FALLBACK_SHAP_VALUES[1]),
+                                             method=attribution, events=self.events, metrics=self.metrics)
+        self.explain_size = explain_size
+        # Error-feedback memory for compressed (top-k / quantized) delta updates
+        self.residuals = None
+
+    def get_parameters(self, config):
+        return get_parameters(self.model)
+
+    def set_parameters(self, parameters):
+        set_parameters(self.model, parameters)
+
+    def fit(self, parameters, config):
+        start = time.perf_counter()
+        self.set_parameters(parameters)
+        avg_loss, accuracy, x_sample = train_epoch(self.model, self.trainloader, self.criterion, self.optimizer)
+        self.round += 1
+        self.logger.writerow([self.round, avg_loss, accuracy])
+        self.log_file.flush()
+        if self.events is not None:
+            self.events.emit("client_round", client=self.client_id, round=self.round, loss=avg_loss, accuracy=accuracy)
+        if self.metrics is not None:
+            self.metrics.add_client_metrics(self.client_id, self.round, avg_loss, accuracy)
+            self.metrics.flush()
+
+        # Attributions run in the background on a weight snapshot, off the reply path
+        windows = sample_windows(self.trainloader.dataset, self.explain_size, seed=self.round)
+        if windows is None:
+            windows = x_sample  # Streaming datasets can't be sampled; use the first batch
+        if windows is not None:
+            self.explainer.submit(self.round, self.model.state_dict(), windows)
+        update, num_examples, metrics = self.compress_update(parameters, config)
+        metrics["fit_duration_s"] = time.perf_counter() - start
+        return update, num_examples, metrics
+
+    def compress_update(self, global_parameters, config):
+        update, self.residuals = compress(self.get_parameters(config={}), config, base=global_parameters, residuals=self.residuals)
+        metrics = {"client_id": self.client_id, "bytes_sent": payload_bytes(update)}
+        if not is_identity(config):
+            metrics["compression"] = describe(config)
+            if "server_round" in config:
+                metrics["base_round"] = config["server_round"]
+        return update, len(self.trainloader.dataset), metrics
+
+    def evaluate(self, parameters, config):
+        start = time.perf_counter()
+        self.set_parameters(parameters)
+        loss, total, accuracy = evaluate_model(self.model, self.trainloader, self.criterion)
+        return loss, total, {"accuracy": accuracy, "client_id": self.client_id, "eval_duration_s": time.perf_counter() - start}
+
+    def close(self):
+        self.explainer.close()
+        self.log_file.close()
+        if self.metrics is not None:
+            self.metrics.close()
+        if self.events is not None:
+            self.events.close()
+
+    def __del__(self):
+        if hasattr(self, 'log_file'):
+            self.log_file.close()
@@ -0,0 +1,159 @@
+"""
+Compressed model-update transport between clients and the Flower server.
+
+Clients can send the difference from the global model instead of full weights
+(delta), quantize values to 16-bit floats or 8-bit affine integers, and keep
+only the top-k fraction of entries per tensor by magnitude. With top-k, the
+entries that were not sent are carried over to the next round (error
+feedback), so small updates are delayed rather than lost.
+
+The server chooses the scheme and ships it to clients in the fit config
+(compression_config). Each tensor is then encoded as three arrays:
+[values, indices, meta]. `indices` is empty for dense tensors and `meta`
+holds the dequantization scale and offset. Shapes are not sent; the decoder
+takes them from the global parameters the update is based on. With the
+default settings (32 bits, no top-k, no delta) updates are plain arrays, as
+before.
+"""
+import numpy as np
+import flwr as fl
+from flwr.common import ndarrays_to_parameters, parameters_to_ndarrays
+
+SUPPORTED_BITS = (32, 16, 8)
+
+def compression_config(bits=32, topk=1.0, delta=False):
+    if bits not in SUPPORTED_BITS:
+        raise ValueError(f"bits must be one of {SUPPORTED_BITS}, got {bits}")
+    if not 0.0 < topk <= 1.0:
+        raise ValueError(f"topk must be in (0, 1], got {topk}")
+    if topk < 1.0 and not delta:
+        raise ValueError("top-k sparsification requires delta updates")
+    return {"compress_bits": bits, "compress_topk": float(topk), "compress_delta": bool(delta)}
+
+def is_identity(config):
+    return (config.get("compress_bits", 32) == 32 and config.get("compress_topk", 1.0) >= 1.0
+            and not config.get("compress_delta", False))
+
+def describe(config):
+    parts = [f"{config.get('compress_bits', 32)}bit"]
+    if config.get("compress_delta", False):
+        parts.insert(0, "delta")
+    if config.get("compress_topk", 1.0) < 1.0:
+        parts.append(f"top{config['compress_topk']:g}")
+    return "+".join(parts)
+
+def payload_bytes(arrays):
+    return int(sum(np.asarray(a).nbytes for a in arrays))
+
+def _quantize(values, bits):
+    values = values.astype(np.float32, copy=False)
+    if bits == 32:
+        return values, np.zeros(2, dtype=np.float32)
+    if bits == 16:
+        return values.astype(np.float16), np.zeros(2, dtype=np.float32)
+    lo = float(values.min()) if values.size else 0.0
+    hi = float(values.max()) if values.size else 0.0
+    scale = (hi - lo) / 255.0 or 1.0
+    q = np.clip(np.rint((values - lo) / scale), 0, 255).astype(np.uint8)
+    return q, np.array([scale, lo], dtype=np.float32)
+
+def _dequantize(values, meta):
+    if values.dtype == np.uint8:
+        scale, lo = meta
+        return values.astype(np.float32) * scale + lo
+    return values.astype(np.float32)
+
+def compress(arrays, config, base=None, residuals=None):
+    """Encode a client update; returns (encoded arrays, new residuals)."""
+    if is_identity(config):
+        return list(arrays), None
+    bits = config.get("compress_bits", 32)
+    topk = config.get("compress_topk", 1.0)
+    delta = config.get("compress_delta", False)
+    encoded, new_residuals = [], []
+    for i, array in enumerate(arrays):
+        update = np.asarray(array, dtype=np.float32)
+        if delta:
+            update = update - np.asarray(base[i], dtype=np.float32)
+        flat = update.ravel()
+        if residuals is not None:
+            flat = flat + residuals[i]
+        if topk < 1.0:
+            k = max(1, int(np.ceil(topk * flat.size)))
+            index_dtype = np.uint16 if flat.size <= np.iinfo(np.uint16).max else np.int32
+            indices = np.argpartition(np.abs(flat), flat.size - k)[flat.size - k:].astype(index_dtype)
+            values, meta = _quantize(flat[indices], bits)
+        else:
+            indices = np.empty(0, dtype=np.int32)
+            values, meta = _quantize(flat, bits)
+        # Error feedback: whatever the server will not reconstruct is kept for next round
+        sent = np.zeros_like(flat)
+        if indices.size:
+            sent[indices] = _dequantize(values, meta)
+        else:
+            sent = _dequantize(values, meta)
+        new_residuals.append(flat - sent)
+        encoded.extend([values, indices, meta])
+    return encoded, new_residuals if delta else None
+
+def decompress(encoded, config, base):
+    """Rebuild full parameter arrays from an encoded update and its base."""
+    if is_identity(config):
+        return list(encoded)
+    delta = config.get("compress_delta", False)
+    arrays = []
+    for i, reference in enumerate(base):
+        values, indices, meta = encoded[3 * i:3 * i + 3]
+        reference = np.asarray(reference)
+        if indices.size:
+            flat = np.zeros(reference.size, dtype=np.float32)
+            flat[indices] = _dequantize(values, meta)
+        else:
+            flat = _dequantize(values, meta)
+        update = flat.reshape(reference.shape)
+        arrays.append((reference + update if delta else update).astype(reference.dtype))
+    return arrays
+
+class CompressedFedAvg(fl.server.strategy.FedAvg):
+    """FedAvg that sends the compression scheme to clients and decodes their updates."""
+    def __init__(self, *, bits=32, topk=1.0, delta=False, **kwargs):
+        super().__init__(**kwargs)
+        self.compression = compression_config(bits, topk, delta)
+        # Global parameters each round's fit instructions were based on; the last
+        # `history_size` rounds are kept so late (stale) updates can still be decoded
+        self.round_parameters = {}
+        self.history_size = 1
+        self.bytes_history = {}
+
+    def configure_fit(self, server_round, parameters, client_manager):
+        self.round_parameters[server_round] = parameters_to_ndarrays(parameters)
+        for old_round in [r for r in self.round_parameters if r <= server_round - self.history_size]:
+            del self.round_parameters[old_round]
+        instructions = super().configure_fit(server_round, parameters, client_manager)
+        for _, fit_ins in instructions:
+            fit_ins.config.update(self.compression)
+            fit_ins.config["server_round"] = server_round
+        return instructions
+
+    def decode_result(self, server_round, fit_res):
+        config = dict(self.compression)
+        if "compression" not in fit_res.metrics:
+            config = {}  # Client sent plain arrays
+        base_round = int(fit_res.metrics.get("base_round", server_round))
+        base = self.round_parameters.get(base_round)
+        arrays = decompress(parameters_to_ndarrays(fit_res.parameters), config, base)
+        fit_res.parameters = ndarrays_to_parameters(arrays)
+        return fit_res
+
+    def aggregate_fit(self, server_round, results, failures):
+        wire_bytes = sum(len(t) for _, fit_res in results for t in fit_res.parameters.tensors)
+        results = [(proxy, self.decode_result(server_round, fit_res)) for proxy, fit_res in results]
+        full_bytes = sum(len(t) for _, fit_res in results for t in fit_res.parameters.tensors)
+        self.bytes_history[server_round] = (wire_bytes, full_bytes)
+        ratio = full_bytes / wire_bytes if wire_bytes else 0.0
+        print(f"[Server] Round {server_round}: {wire_bytes} bytes on wire from {len(results)} clients "
+              f"({describe(self.compression)}, {ratio:.1f}x smaller than uncompressed)")
+        parameters, metrics = super().aggregate_fit(server_round, results, failures)
+        metrics = dict(metrics)
+        metrics.update({"bytes_on_wire": wire_bytes, "bytes_uncompressed": full_bytes})
+        return parameters, metrics
@@ -0,0 +1,32 @@
+"""
+Local event channel for the live dashboard.
+
+Server, clients and the simulation append one JSON object per line to
+data/logs/events.jsonl, e.g.
+
+    {"ts": 1760000000.0, "type": "client_round", "client": 3, "round": 2, "loss": 0.21, "accuracy": 0.64}
+
+Every event is a single O_APPEND write, so lines from concurrent processes
+sharing the file (the docker-compose volume) never interleave. A "run_start"
+event marks the beginning of a new run; readers drop what came before it.
+"""
+import json
+import os
+import time
+
+EVENTS_PATH = "data/logs/events.jsonl"
+
+class EventLog:
+    def __init__(self, path=EVENTS_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def emit(self, kind, **fields):
+        line = json.dumps({"ts": time.time(), "type": kind, **fields}, default=float) + "\n"
+        os.write(self._fd, line.encode())
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
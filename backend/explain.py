@@ -0,0 +1,98 @@
+"""
+Background feature attributions for federated clients.
+
+FLClient.fit hands a snapshot of the model weights and a sample of training
+windows to BackgroundExplainer and replies to the server straight away. A
+single worker thread then explains the windows on a private model copy,
+using the attribution engine chosen by `method` (see backend/attribution.py)
+against a k-means summary of the same windows as background. It appends one
+row per round to data/logs/client_<id>_shap.csv:
+
+    round,heart_rate,steps,sleep,stress_level,spO2
+
+Results are cached by a hash of the model weights, so a round whose model is
+unchanged reuses the previous attributions instead of recomputing them.
+"""
+import concurrent.futures
+import hashlib
+import os
+import threading
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset
+from backend.attribution import attribute, feature_importance, kmeans_background
+from backend.model import HealthRiskLSTM
+from backend.utils.data_loader import FEATURE_COLUMNS
+
+def model_hash(state_dict):
+    digest = hashlib.sha1()
+    for key, tensor in state_dict.items():
+        digest.update(key.encode())
+        digest.update(tensor.detach().cpu().numpy().tobytes())
+    return digest.hexdigest()
+
+def sample_windows(dataset, n, seed=0):
+    """Up to n random windows from a map-style dataset, or None if it is not indexable."""
+    if isinstance(dataset, IterableDataset) or len(dataset) == 0:
+        return None
+    generator = torch.Generator().manual_seed(seed)
+    idx = torch.randperm(len(dataset), generator=generator)[:n]
+    try:
+        return dataset[idx][0]  # WindowedHealthDataset gathers a whole batch at once
+    except (TypeError, IndexError, ValueError):
+        return torch.stack([dataset[i][0] for i in idx.tolist()])
+
+class BackgroundExplainer:
+    def __init__(self, client_id, shap_path, fallback_values=None, method="deep_shap", background_k=16, events=None, metrics=None):
+        self.client_id = client_id
+        self.shap_path = shap_path
+        self.fallback_values = fallback_values
+        self.method = method
+        self.background_k = background_k
+        self.events = events
+        self.metrics = metrics
+        self.cache = {}  # model hash -> per-feature mean |SHAP|
+        self.explained = {}  # round -> model hash
+        self._lock = threading.Lock()
+        # One worker keeps rows in round order and bounds the extra CPU load
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="shap")
+        os.makedirs(os.path.dirname(shap_path) or ".", exist_ok=True)
+        with open(shap_path, "w") as f:
+            f.write(",".join(["round"] + FEATURE_COLUMNS) + "\n")
+
+    def submit(self, server_round, state_dict, windows):
+        # Copy now: the live model keeps training while the job waits
+        snapshot = {k: v.detach().clone() for k, v in state_dict.items()}
+        return self._executor.submit(self._explain, server_round, snapshot, windows.clone())
+
+    def _explain(self, server_round, state_dict, windows):
+        key = model_hash(state_dict)
+        values = self.cache.get(key)
+        if values is None:
+            try:
+                model = HealthRiskLSTM()
+                model.load_state_dict(state_dict)
+                background, weights = kmeans_background(windows, self.background_k)
+                attributions = attribute(model, windows, background, weights, method=self.method)
+                values = feature_importance(attributions)
+                self.cache[key] = values
+            except Exception as e:
+                print(f"[Client {self.client_id}] {self.method} attribution failed: {e}")
+                if self.fallback_values is None:
+                    return None
+                values = np.asarray(self.fallback_values)
+                print(f"[Client {self.client_id}] Generated fallback SHAP data")
+        self.explained[server_round] = key
+        with self._lock, open(self.shap_path, "a") as f:
+            f.write(",".join([str(server_round)] + [f"{v:.8f}" for v in values]) + "\n")
+        if self.metrics is not None:
+            self.metrics.add_shap(self.client_id, server_round, values)
+            self.metrics.flush()
+        if self.events is not None:
+            self.events.emit("shap", client=self.client_id, round=server_round,
+                             **{name: float(v) for name, v in zip(FEATURE_COLUMNS, values)})
+        print(f"[Client {self.client_id}] SHAP values for round {server_round} written")
+        return values
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
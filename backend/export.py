@@ -0,0 +1,128 @@
+"""
+Export HealthRiskLSTM for serving and on-device scoring.
+
+Formats:
+- TorchScript (.pt): torch.jit.trace or torch.jit.script, frozen for inference.
+- ONNX (.onnx): dynamic batch and sequence axes; needs the optional `onnx`
+  package to export and `onnxruntime` to run.
+- Dynamic int8 quantization of the LSTM and Linear layers (quantize=True),
+  which also applies to the TorchScript export.
+
+RiskScorer runs any of these (plus a plain .npz of parameters in eager mode)
+behind one call, scorer(windows) -> risk scores, with a fixed number of
+intra-op threads so latency does not depend on how busy the host is.
+
+    python backend/export.py --model data/models/global_model.npz --format all --quantize
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import torch
+import torch.nn as nn
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.model import HealthRiskLSTM
+from backend.training import load_parameters, set_parameters
+
+EXPORT_DIR = "data/models/export"
+
+def load_eager(path, quantize=False):
+    model = HealthRiskLSTM()
+    set_parameters(model, load_parameters(path))
+    model.eval()
+    return quantize_model(model) if quantize else model
+
+def quantize_model(model):
+    # Weights to int8, activations quantized on the fly per batch
+    return torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+def example_input(batch_size=1, seq_len=10, input_dim=5):
+    return torch.rand(batch_size, seq_len, input_dim)
+
+def export_torchscript(model, path, method="trace", seq_len=10):
+    model.eval()
+    if method == "trace":
+        module = torch.jit.trace(model, example_input(seq_len=seq_len))
+    elif method == "script":
+        module = torch.jit.script(model)
+    else:
+        raise ValueError(f"Unknown TorchScript method {method!r}; choose trace or script")
+    module = torch.jit.freeze(module)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.jit.save(module, path)
+    return path
+
+def export_onnx(model, path, seq_len=10, opset=17):
+    try:
+        import onnx  # noqa: F401 (required by the exporter)
+    except ImportError:
+        raise ImportError("ONNX export needs the onnx package: pip install onnx onnxruntime")
+    model.eval()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.onnx.export(model, (example_input(seq_len=seq_len),), path, dynamo=False, opset_version=opset,
+                      input_names=["windows"], output_names=["risk"],
+                      dynamic_axes={"windows": {0: "batch", 1: "seq_len"}, "risk": {0: "batch"}})
+    return path
+
+class RiskScorer:
+    """scorer(windows) -> float32 risk scores for (N, seq_len, features) windows."""
+    def __init__(self, path, quantize=False, threads=1):
+        self.path = path
+        self.threads = threads
+        self.input_dim = 5
+        extension = os.path.splitext(path)[1]
+        if threads:
+            torch.set_num_threads(threads)
+        if extension == ".onnx":
+            try:
+                import onnxruntime as ort
+            except ImportError:
+                raise ImportError("Running ONNX models needs onnxruntime: pip install onnxruntime")
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = threads or 0
+            options.inter_op_num_threads = 1
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            self.runtime = "onnxruntime"
+        elif extension == ".pt":
+            self.module = torch.jit.load(path)
+            self.runtime = "torchscript"
+        elif extension == ".npz":
+            self.module = load_eager(path, quantize)
+            self.input_dim = self.module.lstm.input_size
+            self.runtime = "eager-int8" if quantize else "eager"
+        else:
+            raise ValueError(f"Unsupported model file {path}; expected .npz, .pt or .onnx")
+
+    def __call__(self, windows):
+        if self.runtime == "onnxruntime":
+            x = np.ascontiguousarray(windows, dtype=np.float32)
+            return self.session.run(None, {"windows": x})[0][:, 0]
+        x = torch.as_tensor(np.asarray(windows, dtype=np.float32))
+        with torch.inference_mode():
+            return self.module(x)[:, 0].numpy()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export HealthRiskLSTM to TorchScript/ONNX.")
+    parser.add_argument("--model", default="data/models/global_model.npz", help="Global model parameters (.npz)")
+    parser.add_argument("--out-dir", default=EXPORT_DIR)
+    parser.add_argument("--format", choices=["torchscript", "onnx", "all"], default="all")
+    parser.add_argument("--method", choices=["trace", "script"], default="trace", help="TorchScript conversion")
+    parser.add_argument("--quantize", action="store_true", help="Also write dynamic int8 TorchScript")
+    parser.add_argument("--seq-len", type=int, default=10)
+    args = parser.parse_args()
+
+    model = load_eager(args.model)
+    stem = os.path.join(args.out_dir, os.path.splitext(os.path.basename(args.model))[0])
+    if args.format in ("torchscript", "all"):
+        print(f"[Export] {export_torchscript(model, f'{stem}.pt', args.method, args.seq_len)}")
+        if args.quantize:
+            print(f"[Export] {export_torchscript(quantize_model(model), f'{stem}.int8.pt', 'trace', args.seq_len)}")
+    if args.format in ("onnx", "all"):
+        try:
+            print(f"[Export] {export_onnx(model, f'{stem}.onnx', args.seq_len)}")
+        except ImportError as e:
+            print(f"[Export] Skipping ONNX: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+FHIR Bulk Data ($export) ingestion: population-scale Patients/Observations ->
+per-user daily time series CSVs without one Observation search per patient.
+
+Workflow (FHIR Bulk Data Access IG):
+1. Kick-off: GET [base]/$export?_type=Patient,Observation with
+   `Prefer: respond-async`; the server answers 202 and a status URL in
+   Content-Location.
+2. Poll the status URL, honouring Retry-After, until it returns the manifest
+   listing the NDJSON output files.
+3. Stream every file line by line. Observations are parsed in the same pass
+   and sharded by patient into on-disk spill files. Streaming only holds the
+   write buffer (BUFFER_ROWS), but each shard is read back whole in step 4,
+   so peak memory is about one shard: Observations / shards rows. By default
+   the shard count comes from the manifest's Observation `count`
+   (SHARD_ROWS per shard); with a fixed --shards, or a server that omits
+   counts, it grows linearly with the export.
+4. Each shard is pivoted per patient (fhir_integration.pivot_daily) into
+   user_<n>.csv; n follows the order of the Patient export.
+
+    python backend/fhir_bulk.py              # shards sized from the manifest counts
+    python backend/fhir_bulk.py --shards 64  # fixed shard count
+    python backend/fhir_stub.py --export-dir exports/   # local stand-in serving NDJSON from disk
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend import fhir_integration
+from backend.fhir_integration import FEATURE_INDEX, PROCESSED_DIR, make_session, pivot_daily
+
+DEFAULT_SHARDS = 16  # When the manifest has no Observation counts
+SHARD_ROWS = 1_000_000  # Target Observations per shard, i.e. rows read back at once
+BUFFER_ROWS = 100_000  # Spilled rows held in memory before appending them to the shard files
+
+# Kick off a system-level export; returns the status URL to poll
+def kick_off(session, base_url, types=("Patient", "Observation"), since=None, timeout=30):
+    params = {'_type': ",".join(types)}
+    if since:
+        params['_since'] = since
+    resp = session.get(f"{base_url}/$export", params=params, timeout=timeout,
+                       headers={'Prefer': 'respond-async', 'Accept': 'application/fhir+json'})
+    if resp.status_code != 202:
+        raise RuntimeError(f"$export kick-off failed with {resp.status_code}: {resp.text[:500]}")
+    return resp.headers['Content-Location']
+
+# Poll until the export completes; returns the manifest
+def wait_for_manifest(session, status_url, poll_seconds=1.0, max_wait=3600, timeout=30):
+    deadline = time.monotonic() + max_wait
+    last_progress = None
+    while True:
+        resp = session.get(status_url, timeout=timeout)
+        if resp.status_code == 200:
+            return resp.json()
+        if resp.status_code != 202:
+            raise RuntimeError(f"$export failed with {resp.status_code}: {resp.text[:500]}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"$export at {status_url} not finished after {max_wait}s")
+        progress = resp.headers.get('X-Progress')
+        if progress and progress != last_progress:
+            print(f"Export in progress: {progress}")
+            last_progress = progress
+        retry_after = resp.headers.get('Retry-After', '')
+        time.sleep(float(retry_after) if retry_after.replace('.', '', 1).isdigit() else poll_seconds)
+
+# Enough shards for about SHARD_ROWS Observations each, from the optional `count` of the manifest outputs
+def shards_for(manifest, shard_rows=SHARD_ROWS):
+    counts = [output.get('count') for output in manifest.get('output', []) if output['type'] == 'Observation']
+    if not counts or any(count is None for count in counts):
+        return DEFAULT_SHARDS
+    return max(1, -(-sum(counts) // shard_rows))
+
+# Stream one NDJSON output file, yielding resources without holding the file in memory
+def iter_ndjson(session, url, timeout=60):
+    with session.get(url, stream=True, timeout=timeout, headers={'Accept': 'application/fhir+ndjson'}) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if line:
+                yield json.loads(line)
+
+class ShardWriter:
+    """Spills (patient, date, feature, value) rows into num_shards CSV files keyed by patient."""
+    def __init__(self, work_dir, num_shards=DEFAULT_SHARDS, buffer_rows=BUFFER_ROWS):
+        self.paths = [os.path.join(work_dir, f"shard_{k:03d}.csv") for k in range(num_shards)]
+        self.buffers = [[] for _ in range(num_shards)]
+        self.buffer_rows = buffer_rows
+        self.buffered = 0
+        self.shard_of = {}  # patient id -> shard; assigned round-robin in order of first appearance
+
+    def add(self, patient_id, date, feature, value):
+        shard = self.shard_of.get(patient_id)
+        if shard is None:
+            shard = self.shard_of[patient_id] = len(self.shard_of) % len(self.paths)
+        self.buffers[shard].append(f"{patient_id},{date},{feature},{value!r}\n")
+        self.buffered += 1
+        if self.buffered >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        for path, rows in zip(self.paths, self.buffers):
+            if rows:
+                with open(path, "a") as f:
+                    f.writelines(rows)
+                rows.clear()
+        self.buffered = 0
+
+    def shards(self):
+        self.flush()
+        return [path for path in self.paths if os.path.exists(path)]
+
+# Parse Observations from a stream into the shard files; returns how many were kept
+def shard_observations(resources, writer):
+    kept = 0
+    for resource in resources:
+        if resource.get('resourceType') != 'Observation':
+            continue
+        feature = FEATURE_INDEX.get(resource.get('code', {}).get('text', ''))
+        value = resource.get('valueQuantity', {}).get('value')
+        date = resource.get('effectiveDateTime', '')[:10]  # Use only YYYY-MM-DD
+        subject = resource.get('subject', {}).get('reference', '')
+        if feature is None or value is None or not date or not subject.startswith('Patient/'):
+            continue
+        writer.add(subject[len('Patient/'):], date, feature, float(value))
+        kept += 1
+    return kept
+
+# Pivot each shard per patient into user_<n>.csv; returns the number of CSVs written
+def write_shards(shard_paths, user_index, out_dir):
+    written = 0
+    for path in shard_paths:
+        rows = pd.read_csv(path, header=None, names=['patient', 'date', 'feature', 'value'],
+                           dtype={'patient': str, 'date': str, 'feature': 'int8', 'value': 'float64'})
+        # groupby keeps file order within a patient, so the last value of a (date, feature) still wins
+        for pid, group in rows.groupby('patient', sort=False):
+            if pid not in user_index:
+                user_index[pid] = len(user_index) + 1
+            df = pivot_daily(group['date'].to_numpy(), group['feature'].to_numpy(), group['value'].to_numpy())
+            df.to_csv(os.path.join(out_dir, f"user_{user_index[pid]}.csv"), index=False)
+            written += 1
+    return written
+
+def bulk_export_to_csv(base_url=None, out_dir=None, num_shards=None, work_dir=None,
+                       since=None, session=None, buffer_rows=BUFFER_ROWS):
+    base_url = base_url or fhir_integration.FHIR_BASE_URL
+    out_dir = out_dir or PROCESSED_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    session = session or make_session(pool_size=1)
+    start = time.perf_counter()
+    status_url = kick_off(session, base_url, since=since)
+    manifest = wait_for_manifest(session, status_url)
+    if num_shards is None:
+        num_shards = shards_for(manifest)
+    # Patient files first so user_<n> follows the Patient export order
+    outputs = sorted(manifest.get('output', []), key=lambda o: o['type'] != 'Patient')
+    spill_dir = tempfile.mkdtemp(prefix="fhir-bulk-", dir=work_dir)
+    user_index = {}
+    try:
+        writer = ShardWriter(spill_dir, num_shards, buffer_rows)
+        observations = 0
+        for output in outputs:
+            resources = iter_ndjson(session, output['url'])
+            if output['type'] == 'Patient':
+                for patient in resources:
+                    user_index.setdefault(patient['id'], len(user_index) + 1)
+            elif output['type'] == 'Observation':
+                observations += shard_observations(resources, writer)
+        written = write_shards(writer.shards(), user_index, out_dir)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    session.delete(status_url, timeout=30)  # Let the server discard the export files
+    print(f"Bulk export: {observations} observations from {len(outputs)} files in {num_shards} shards -> {written} CSVs "
+          f"in {time.perf_counter() - start:.1f}s")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a FHIR Bulk Data $export into per-user time series CSVs.")
+    parser.add_argument('--base-url', default=fhir_integration.FHIR_BASE_URL)
+    parser.add_argument('--out-dir', default=PROCESSED_DIR)
+    parser.add_argument('--shards', type=int, default=None,
+                        help=f'Patient shards spilled to disk; peak memory is roughly one shard '
+                             f'(default: one per {SHARD_ROWS:,} Observations in the manifest, else {DEFAULT_SHARDS})')
+    parser.add_argument('--work-dir', help='Where to put the temporary shard files (default: system temp)')
+    parser.add_argument('--since', help='Only resources updated after this instant (_since)')
+    args = parser.parse_args()
+    bulk_export_to_csv(args.base_url, args.out_dir, args.shards, args.work_dir, args.since)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,42 @@
+"""
+FHIR ingestion: Patients and their Observations -> per-user daily time series CSVs.
+
+Requests go through one pooled requests.Session (keep-alive connections,
+urllib3 Retry with exponential backoff on 429/5xx honouring Retry-After), and
+every searchset Bundle is followed through its `next` links. Patients are
+fetched and converted by a bounded thread pool, so ingestion time is
+dominated by server latency / workers rather than the patient count.
+
+--sync keeps a per-patient `_lastUpdated` watermark in
+data/processed/fhir_sync_state.json, asks the server only for Observations
+updated after it and upserts the resulting rows by date into the existing
+user_<n>.csv, so a daily sync costs in proportion to what changed. The first
+--sync (no state yet) downloads everything.
+
+For whole populations use the Bulk Data $export path in backend/fhir_bulk.py.
+
+    python backend/fhir_integration.py --to-csv --workers 16
+    python backend/fhir_integration.py --sync     # only Observations changed since the last sync
+    python backend/fhir_stub.py &   # local stub server for testing (FHIR_BASE_URL=http://127.0.0.1:8090)
+"""
 import requests
 import pandas as pd
 import os
 import argparse
+import json
+import threading
+import time
 import numpy as np
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 FHIR_BASE_URL = os.environ.get("FHIR_BASE_URL", "https://hapi.fhir.org/baseR4")
 PROCESSED_DIR = "data/processed"
+DEFAULT_WORKERS = 16
+# Failures that skip one patient (network/HTTP errors, malformed resources) instead of the whole run
+PATIENT_ERRORS = (requests.RequestException, KeyError, ValueError)
+SYNC_STATE_PATH = os.path.join(PROCESSED_DIR, "fhir_sync_state.json")
 
 # Mapping from FHIR Observation type to model feature
 FHIR_TO_MODEL = {
@@ -24,62 +54,220 @@ FHIR_TO_MODEL = {
     'SpO2': 'spO2',
 }
 MODEL_FEATURES = ['heart_rate', 'steps', 'sleep', 'stress_level', 'spO2']
+# Code text -> column in MODEL_FEATURES, precomputed so parsing is one dict lookup per entry
+FEATURE_INDEX = {code: MODEL_FEATURES.index(feat) for code, feat in FHIR_TO_MODEL.items()}
+
+_local = threading.local()
+
+# Pooled session with retry/backoff; connections are reused across requests and threads
+def make_session(pool_size=DEFAULT_WORKERS, retries=5, backoff=0.5):
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET"]), respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept"] = "application/fhir+json"
+    return session
+
+def default_session():
+    if not hasattr(_local, "session"):
+        _local.session = make_session()
+    return _local.session
+
+# Follow a searchset Bundle through all of its `next` pages
+def fetch_bundle_entries(url, params=None, session=None, timeout=30):
+    session = session or default_session()
+    entries = []
+    while url:
+        resp = session.get(url, params=params, timeout=timeout)
+        resp.raise_for_status()
+        bundle = resp.json()
+        entries.extend(bundle.get('entry', []))
+        url = next((link['url'] for link in bundle.get('link', []) if link.get('relation') == 'next'), None)
+        params = None  # The next link carries the full query
+    return entries
 
 # Fetch FHIR Patient resources
-def fetch_patients():
-    resp = requests.get(f"{FHIR_BASE_URL}/Patient")
-    resp.raise_for_status()
-    return resp.json().get('entry', [])
-
-# Fetch Observations for a patient
-def fetch_observations(patient_id):
-    resp = requests.get(f"{FHIR_BASE_URL}/Observation?subject=Patient/{patient_id}")
-    resp.raise_for_status()
-    return resp.json().get('entry', [])
-
-# Parse FHIR Observation to dict
-def parse_observation(obs):
-    resource = obs['resource']
-    code = resource.get('code', {}).get('text', '')
-    value = resource.get('valueQuantity', {}).get('value', None)
-    date = resource.get('effectiveDateTime', '')
-    if date:
-        date = date[:10]  # Use only YYYY-MM-DD
-    return {'date': date, 'type': code, 'value': value}
+def fetch_patients(session=None, page_size=100):
+    return fetch_bundle_entries(f"{FHIR_BASE_URL}/Patient", {'_count': page_size}, session)
+
+# Fetch Observations for a patient, optionally only those updated after `since`
+def fetch_observations(patient_id, session=None, page_size=200, since=None):
+    params = {'subject': f"Patient/{patient_id}", '_count': page_size}
+    if since:
+        params['_lastUpdated'] = f"gt{since}"
+    return fetch_bundle_entries(f"{FHIR_BASE_URL}/Observation", params, session)
+
+# Flatten Bundle entries into columnar arrays in one pass, keeping only mapped, dated, valued Observations
+def flatten_observations(obs_entries):
+    dates, features, values = [], [], []
+    for obs in obs_entries:
+        resource = obs['resource']
+        feature = FEATURE_INDEX.get(resource.get('code', {}).get('text', ''))
+        value = resource.get('valueQuantity', {}).get('value')
+        date = resource.get('effectiveDateTime', '')[:10]  # Use only YYYY-MM-DD
+        if feature is not None and value is not None and date:
+            dates.append(date)
+            features.append(feature)
+            values.append(value)
+    return (np.array(dates, dtype=object), np.array(features, dtype=np.int8),
+            np.array(values, dtype=np.float64))
+
+# Pivot columnar (date, feature, value) Observations to one row per date; the last value of a feature on a date wins
+def pivot_daily(dates, features, values):
+    # One cell per (date, feature) in a dense grid; the reversed unique keeps each cell's last value
+    date_codes, days = pd.factorize(dates, sort=True)
+    cells = date_codes * len(MODEL_FEATURES) + features
+    _, last = np.unique(cells[::-1], return_index=True)
+    last = len(cells) - 1 - last
+    grid = np.full((len(days), len(MODEL_FEATURES)), np.nan)
+    grid[date_codes[last], features[last]] = values[last]
+    df = pd.DataFrame(grid, columns=MODEL_FEATURES)
+    df.insert(0, 'date', days)
+    # Synthesize a label (random for demo)
+    df['cardiovascular_risk'] = (np.random.rand(len(df)) > 0.5).astype(float)
+    return df
+
+def observations_to_frame(obs_entries):
+    dates, features, values = flatten_observations(obs_entries)
+    return pivot_daily(dates, features, values) if len(dates) else None
+
+def ingest_patient(index, pid, session=None, page_size=200, out_dir=None):
+    df = observations_to_frame(fetch_observations(pid, session, page_size))
+    if df is None:
+        return index, pid, 0
+    df.to_csv(os.path.join(out_dir or PROCESSED_DIR, f"user_{index}.csv"), index=False)
+    return index, pid, len(df)
 
 # Convert FHIR data to time series per-user CSVs
-def fhir_to_timeseries_csv():
-    os.makedirs(PROCESSED_DIR, exist_ok=True)
-    patients = fetch_patients()
-    for i, entry in enumerate(patients):
-        patient = entry['resource']
-        pid = patient['id']
-        obs_entries = fetch_observations(pid)
-        obs_data = [parse_observation(obs) for obs in obs_entries if parse_observation(obs)['date']]
-        # Group by date
-        by_date = defaultdict(dict)
-        for obs in obs_data:
-            model_feat = FHIR_TO_MODEL.get(obs['type'])
-            if model_feat and obs['value'] is not None:
-                by_date[obs['date']][model_feat] = obs['value']
-        # Build time series rows
-        rows = []
-        for date, feats in by_date.items():
-            row = {'date': date}
-            for f in MODEL_FEATURES:
-                row[f] = feats.get(f, np.nan)
-            # Synthesize a label (random for demo)
-            row['cardiovascular_risk'] = float(np.random.rand() > 0.5)
-            rows.append(row)
-        if rows:
-            df = pd.DataFrame(rows)
-            df = df.sort_values('date')
-            df.to_csv(os.path.join(PROCESSED_DIR, f"user_{i+1}.csv"), index=False)
-            print(f"Wrote user_{i+1}.csv for Patient {pid} with {len(df)} rows")
+def fhir_to_timeseries_csv(workers=DEFAULT_WORKERS, page_size=200, out_dir=None):
+    out_dir = out_dir or PROCESSED_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    session = make_session(pool_size=workers)
+    patients = fetch_patients(session)
+    written = 0
+    failed = []
+    # user_<n> numbering follows the Patient listing order, as before
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        patient_ids = [entry['resource']['id'] for entry in patients]
+        futures = [(pid, pool.submit(ingest_patient, i + 1, pid, session, page_size, out_dir))
+                   for i, pid in enumerate(patient_ids)]
+        for pid, future in futures:
+            try:
+                index, _, num_rows = future.result()
+            except PATIENT_ERRORS as e:
+                failed.append(pid)
+                print(f"Failed to ingest Patient {pid}: {type(e).__name__}: {e}")
+                continue
+            if num_rows:
+                written += 1
+                print(f"Wrote user_{index}.csv for Patient {pid} with {num_rows} rows")
+    print(f"Ingested {len(patients)} patients ({written} with data) in {time.perf_counter() - start:.1f}s "
+          f"using {workers} workers")
+    if failed:
+        print(f"{len(failed)} patients failed: {', '.join(failed)}")
+    return written
+
+# Newest meta.lastUpdated among the entries; becomes the patient's next watermark
+def latest_update(obs_entries, current=None):
+    stamps = [obs['resource'].get('meta', {}).get('lastUpdated') for obs in obs_entries]
+    stamps = [stamp for stamp in stamps if stamp]
+    if not stamps:
+        return current
+    newest = max(stamps, key=pd.Timestamp)
+    if current is None or pd.Timestamp(newest) > pd.Timestamp(current):
+        return newest
+    return current
+
+# Merge new daily rows into a user CSV: new feature values win, labels of existing dates are kept
+def upsert_timeseries(path, new_df):
+    new = new_df.set_index('date')
+    if os.path.exists(path):
+        existing = pd.read_csv(path, dtype={'date': str}).set_index('date')
+        merged = new.combine_first(existing)
+        merged['cardiovascular_risk'] = existing['cardiovascular_risk'].combine_first(new['cardiovascular_risk'])
+    else:
+        merged = new
+    merged = merged.sort_index().reset_index()[['date'] + MODEL_FEATURES + ['cardiovascular_risk']]
+    tmp = f"{path}.tmp"
+    merged.to_csv(tmp, index=False)
+    os.replace(tmp, path)  # Readers never see a half-written CSV
+    return len(merged)
+
+def sync_patient(index, pid, watermark, session=None, page_size=200, out_dir=None):
+    obs_entries = fetch_observations(pid, session, page_size, since=watermark)
+    df = observations_to_frame(obs_entries)
+    if df is not None:
+        upsert_timeseries(os.path.join(out_dir or PROCESSED_DIR, f"user_{index}.csv"), df)
+    return pid, latest_update(obs_entries, watermark), len(obs_entries)
+
+def load_sync_state(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('base_url') == FHIR_BASE_URL:
+            return state
+        print(f"Sync state {path} is for {state.get('base_url')}; doing a full sync of {FHIR_BASE_URL}")
+    return {'base_url': FHIR_BASE_URL, 'patients': {}}
+
+def save_sync_state(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+# Incremental sync: fetch only Observations updated after each patient's watermark and upsert them
+def incremental_sync(workers=DEFAULT_WORKERS, page_size=200, out_dir=None, state_path=None):
+    out_dir = out_dir or PROCESSED_DIR
+    state_path = state_path or os.path.join(out_dir, os.path.basename(SYNC_STATE_PATH))
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    state = load_sync_state(state_path)
+    known = state['patients']
+    session = make_session(pool_size=workers)
+    patients = [entry['resource']['id'] for entry in fetch_patients(session)]
+    # Known patients keep their user_<n>; new ones are numbered after the highest so far
+    next_index = max((p['user'] for p in known.values()), default=0) + 1
+    for pid in patients:
+        if pid not in known:
+            known[pid] = {'user': next_index, 'watermark': None}
+            next_index += 1
+    fetched = updated = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(pid, pool.submit(sync_patient, known[pid]['user'], pid, known[pid]['watermark'], session,
+                                     page_size, out_dir))
+                   for pid in patients]
+        for pid, future in futures:
+            try:
+                _, watermark, num_obs = future.result()
+            except PATIENT_ERRORS as e:
+                # Watermark left as is, so the next sync fetches this patient's updates again
+                failed.append(pid)
+                print(f"Failed to sync Patient {pid}: {type(e).__name__}: {e}")
+                continue
+            known[pid]['watermark'] = watermark
+            fetched += num_obs
+            updated += num_obs > 0
+    save_sync_state(state_path, state)
+    print(f"Synced {len(patients)} patients: {fetched} new/updated observations for {updated} patients "
+          f"in {time.perf_counter() - start:.1f}s")
+    if failed:
+        print(f"{len(failed)} patients failed and will be retried on the next sync: {', '.join(failed)}")
+    return fetched
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest FHIR data and generate per-user time series CSVs.")
     parser.add_argument('--to-csv', action='store_true', help='Fetch FHIR data and write per-user time series CSVs')
+    parser.add_argument('--sync', action='store_true',
+                        help='Fetch only Observations updated since the last sync and upsert them into the CSVs')
+    parser.add_argument('--state-path', default=SYNC_STATE_PATH, help='Per-patient _lastUpdated watermarks for --sync')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Patients fetched concurrently')
+    parser.add_argument('--page-size', type=int, default=200, help='_count per Observation search page')
     args = parser.parse_args()
-    if args.to_csv:
-        fhir_to_timeseries_csv() 
\ No newline at end of file
+    if args.sync:
+        incremental_sync(args.workers, args.page_size, state_path=args.state_path)
+    elif args.to_csv:
+        fhir_to_timeseries_csv(args.workers, args.page_size) 
\ No newline at end of file
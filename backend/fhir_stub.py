@@ -0,0 +1,315 @@
+"""
+Local stub FHIR R4 server for testing and benchmarking ingestion.
+
+Serves deterministic synthetic Patients and Observations as paginated
+searchset Bundles with `next` links, like a real FHIR server:
+
+    GET /Patient?_count=100&_getpagesoffset=0
+    GET /Observation?subject=Patient/<id>&_count=200
+    GET /Observation?subject=Patient/<id>&_lastUpdated=gt2024-01-05T00:00:00+00:00
+
+Each Observation carries meta.lastUpdated (an hour after it was taken, or
+the time of its last amend()), and `_lastUpdated` accepts the gt/ge/lt/le
+prefixes, so incremental sync can be exercised by growing
+observations_per_patient or amending values between syncs.
+
+It also implements the Bulk Data $export flow: kick-off returns 202 with a
+status URL in Content-Location, the status endpoint answers 202 (with
+Retry-After) for --export-polls polls and then the manifest, and the NDJSON
+files are streamed from disk. --export-dir serves existing files
+(<ResourceType>.<anything>.ndjson); otherwise the synthetic data is written
+once to a temporary directory, Observations interleaved across patients.
+
+    GET /$export?_type=Patient,Observation   (Prefer: respond-async)
+    GET /bulkstatus/<job>    DELETE /bulkstatus/<job>
+    GET /bulkfiles/<name>.ndjson
+
+--latency-ms adds a per-request delay to emulate a remote server and
+--error-rate answers that fraction of requests with 503 + Retry-After, to
+exercise client retries.
+
+    python backend/fhir_stub.py --patients 2000 --observations 60 --latency-ms 20
+    FHIR_BASE_URL=http://127.0.0.1:8090 python backend/fhir_integration.py --to-csv
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# Observation code texts understood by fhir_integration.FHIR_TO_MODEL, with plausible value ranges
+OBSERVATION_TYPES = [
+    ("Heart rate", "/min", 55, 110),
+    ("Step count", "steps", 0, 15000),
+    ("Sleep duration", "h", 3, 10),
+    ("Stress level", "{score}", 0, 10),
+    ("Oxygen saturation", "%", 90, 100),
+]
+
+class StubFHIRData:
+    def __init__(self, num_patients=100, observations_per_patient=50, start=date(2024, 1, 1), seed=0):
+        self.num_patients = num_patients
+        self.observations_per_patient = observations_per_patient
+        self.start = start
+        self.seed = seed
+        self.amendments = {}  # (patient id, n) -> (value, lastUpdated)
+
+    def patient_ids(self):
+        return [f"stub-{k}" for k in range(self.num_patients)]
+
+    def patient(self, patient_id):
+        return {"resourceType": "Patient", "id": patient_id}
+
+    def amend(self, patient_id, n, value, updated=None):
+        """Correct observation n of a patient; it then reports the new value and lastUpdated."""
+        self.amendments[(patient_id, n)] = (value, updated or datetime.now(timezone.utc))
+
+    def observations(self, patient_id):
+        rng = random.Random(f"{self.seed}-{patient_id}")
+        resources = []
+        for n in range(self.observations_per_patient):
+            text, unit, low, high = OBSERVATION_TYPES[n % len(OBSERVATION_TYPES)]
+            day = self.start + timedelta(days=n // len(OBSERVATION_TYPES))
+            value = round(rng.uniform(low, high), 1)
+            updated = datetime.combine(day, dtime(8), timezone.utc) + timedelta(hours=1, seconds=n)
+            value, updated = self.amendments.get((patient_id, n), (value, updated))
+            resources.append({
+                "resourceType": "Observation",
+                "id": f"{patient_id}-obs-{n}",
+                "meta": {"lastUpdated": updated.isoformat()},
+                "status": "final",
+                "code": {"text": text},
+                "subject": {"reference": f"Patient/{patient_id}"},
+                "effectiveDateTime": f"{day.isoformat()}T08:00:00Z",
+                "valueQuantity": {"value": value, "unit": unit},
+            })
+        return resources
+
+LAST_UPDATED_PREFIXES = {
+    "gt": lambda a, b: a > b, "ge": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b, "le": lambda a, b: a <= b, "eq": lambda a, b: a == b,
+}
+
+def write_ndjson(data, out_dir, resources_per_file=100_000, block=100):
+    """Write Patient and Observation NDJSON export files. Observations are interleaved across
+    each block of patients (observation n of every patient, then n + 1) like a real export."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+
+    def write(resource_type, resources):
+        for part in itertools.count():
+            chunk = list(itertools.islice(resources, resources_per_file))
+            if not chunk:
+                break
+            path = os.path.join(out_dir, f"{resource_type}.{part:03d}.ndjson")
+            with open(path, "w") as f:
+                f.writelines(json.dumps(r) + "\n" for r in chunk)
+            paths.append(path)
+
+    pids = data.patient_ids()
+    write("Patient", (data.patient(pid) for pid in pids))
+    write("Observation", (obs for k in range(0, len(pids), block)
+                          for per_tick in itertools.zip_longest(*(data.observations(pid) for pid in pids[k:k + block]))
+                          for obs in per_tick if obs is not None))
+    return paths
+
+def filter_last_updated(resources, value):
+    prefix, stamp = (value[:2], value[2:]) if value[:2] in LAST_UPDATED_PREFIXES else ("eq", value)
+    bound = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    if bound.tzinfo is None:
+        bound = bound.replace(tzinfo=timezone.utc)
+    compare = LAST_UPDATED_PREFIXES[prefix]
+    return [r for r in resources if compare(datetime.fromisoformat(r["meta"]["lastUpdated"]), bound)]
+
+def searchset(resources, base_url, path, params, offset, count):
+    page = resources[offset:offset + count]
+    bundle = {
+        "resourceType": "Bundle",
+        "type": "searchset",
+        "total": len(resources),
+        "link": [{"relation": "self", "url": f"{base_url}{path}?{urlencode({**params, '_getpagesoffset': offset, '_count': count})}"}],
+        "entry": [{"fullUrl": f"{base_url}/{r['resourceType']}/{r['id']}", "resource": r} for r in page],
+    }
+    if offset + count < len(resources):
+        next_params = {**params, "_getpagesoffset": offset + count, "_count": count}
+        bundle["link"].append({"relation": "next", "url": f"{base_url}{path}?{urlencode(next_params)}"})
+    return bundle
+
+def make_server(data, host="127.0.0.1", port=8090, latency_ms=0.0, error_rate=0.0, default_count=50,
+                export_dir=None, export_polls=1):
+    stats = {"requests": 0, "errors": 0, "exports": 0}
+    lock = threading.Lock()
+    jobs = {}  # job id -> {"polls": remaining 202s, "types": requested resource types, "ready": Event}
+    export = {"dir": export_dir, "lock": threading.Lock()}
+
+    def prepare_export(ready):
+        # Synthetic files are written once, in the background like a real server's export job
+        with export["lock"]:
+            if export["dir"] is None or not glob.glob(os.path.join(export["dir"], "*.ndjson")):
+                export["dir"] = export["dir"] or tempfile.mkdtemp(prefix="fhir-export-")
+                write_ndjson(data, export["dir"])
+        ready.set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/fhir+json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _kick_off(self, base_url, query):
+            types = set(query["_type"].split(",")) if query.get("_type") else None
+            with lock:
+                stats["exports"] += 1
+                job = str(stats["exports"])
+                jobs[job] = {"polls": export_polls, "types": types, "ready": threading.Event()}
+            threading.Thread(target=prepare_export, args=(jobs[job]["ready"],), daemon=True).start()
+            self.send_response(202)
+            self.send_header("Content-Location", f"{base_url}/bulkstatus/{job}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def _status(self, base_url, job):
+            with lock:
+                state = jobs.get(job)
+                waiting = state is not None and (state["polls"] > 0 or not state["ready"].is_set())
+                if state is not None and state["polls"] > 0:
+                    state["polls"] -= 1
+            if state is None:
+                self._reply(404, {"resourceType": "OperationOutcome", "issue": [{"diagnostics": "unknown job"}]})
+            elif waiting:
+                self.send_response(202)
+                self.send_header("X-Progress", "in progress")
+                self.send_header("Retry-After", "0" if state["ready"].is_set() else "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                output = []
+                for path in sorted(glob.glob(os.path.join(export["dir"], "*.ndjson"))):
+                    resource_type = os.path.basename(path).split(".", 1)[0]
+                    if state["types"] is None or resource_type in state["types"]:
+                        with open(path, "rb") as f:
+                            count = sum(1 for line in f if line.strip())
+                        output.append({"type": resource_type, "url": f"{base_url}/bulkfiles/{os.path.basename(path)}",
+                                       "count": count})
+                self._reply(200, {"transactionTime": datetime.now(timezone.utc).isoformat(),
+                                  "request": f"{base_url}/$export", "requiresAccessToken": False,
+                                  "output": output, "error": []})
+
+        def _file(self, name):
+            path = os.path.join(export["dir"] or "", os.path.basename(name))
+            if export["dir"] is None or not os.path.isfile(path):
+                self._reply(404, {"resourceType": "OperationOutcome"})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/fhir+ndjson")
+            self.send_header("Content-Length", str(os.path.getsize(path)))
+            self.end_headers()
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+
+        def do_DELETE(self):
+            job = urlparse(self.path).path.rsplit("/", 1)[-1]
+            with lock:
+                found = jobs.pop(job, None) is not None
+            self.send_response(202 if found else 404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            with lock:
+                stats["requests"] += 1
+            if latency_ms:
+                time.sleep(latency_ms / 1000.0)
+            if error_rate and random.random() < error_rate:
+                with lock:
+                    stats["errors"] += 1
+                self._reply(503, {"resourceType": "OperationOutcome"}, {"Retry-After": "0"})
+                return
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            offset = int(query.pop("_getpagesoffset", 0))
+            count = int(query.pop("_count", default_count))
+            base_url = f"http://{self.headers.get('Host')}"
+            if url.path in ("/$export", "/Patient/$export"):
+                self._kick_off(base_url, query)
+                return
+            if url.path.startswith("/bulkstatus/"):
+                self._status(base_url, url.path.rsplit("/", 1)[-1])
+                return
+            if url.path.startswith("/bulkfiles/"):
+                self._file(url.path.rsplit("/", 1)[-1])
+                return
+            if url.path == "/Patient":
+                resources = [data.patient(pid) for pid in data.patient_ids()]
+            elif url.path == "/Observation":
+                subject = query.get("subject", "")
+                if not subject.startswith("Patient/"):
+                    self._reply(400, {"resourceType": "OperationOutcome", "issue": [{"diagnostics": "subject required"}]})
+                    return
+                resources = data.observations(subject.split("/", 1)[1])
+                if "_lastUpdated" in query:
+                    try:
+                        resources = filter_last_updated(resources, query["_lastUpdated"])
+                    except ValueError:
+                        self._reply(400, {"resourceType": "OperationOutcome", "issue": [{"diagnostics": "bad _lastUpdated"}]})
+                        return
+            else:
+                self._reply(404, {"resourceType": "OperationOutcome"})
+                return
+            self._reply(200, searchset(resources, base_url, url.path, query, offset, count))
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 256
+
+    httpd = Server((host, port), Handler)
+    httpd.stats = stats
+    return httpd
+
+def start_in_thread(data, **kwargs):
+    """Start a stub server on a free port in a daemon thread; returns (httpd, base_url)."""
+    kwargs.setdefault("port", 0)
+    httpd = make_server(data, **kwargs)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    host, port = httpd.server_address[:2]
+    return httpd, f"http://{host}:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic FHIR Patients/Observations locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--patients", type=int, default=100)
+    parser.add_argument("--observations", type=int, default=50, help="Observations per patient")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--export-dir", help="Serve these NDJSON files from $export instead of synthetic data")
+    parser.add_argument("--export-polls", type=int, default=1, help="Status polls answered 202 before the manifest")
+    args = parser.parse_args()
+    httpd = make_server(StubFHIRData(args.patients, args.observations), args.host, args.port,
+                        args.latency_ms, args.error_rate, export_dir=args.export_dir, export_polls=args.export_polls)
+    print(f"[FHIR stub] {args.patients} patients on http://{args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
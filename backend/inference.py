@@ -0,0 +1,181 @@
+"""
+Batch inference service for the aggregated HealthRiskLSTM.
+
+Loads a global model saved with backend.training.save_parameters (an .npz of
+the state_dict arrays), or a TorchScript/ONNX export from backend/export.py,
+and serves risk scores over HTTP:
+
+    POST /predict  {"windows": [[[hr, steps, sleep, stress, spO2], ...seq_len rows], ...]}
+                -> {"risk": [0.12, ...]}
+    GET  /health
+
+Windows are expected in the same min-max normalized feature space the
+clients train on. Concurrent requests are coalesced by MicroBatcher: the
+first waiting request opens a batch, and it is run through the model as soon
+as it holds max_batch_size windows or max_latency_ms has passed, whichever
+comes first.
+
+    python backend/inference.py --model data/models/global_model.npz --port 8000
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.export import RiskScorer
+
+# Refreshed by the server's checkpointing (backend/checkpoint.py) after every checkpoint
+MODEL_PATH = "data/models/global_model.npz"
+
+class MicroBatcher:
+    """Coalesces concurrent predict() calls into batched forward passes on one worker thread."""
+    def __init__(self, scorer, max_batch_size=64, max_latency_ms=5.0):
+        self.scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.batches = 0
+        self.windows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def predict(self, windows, timeout=None):
+        """Risk scores for a (N, seq_len, features) array; blocks until its batch has run."""
+        return self.submit(windows).result(timeout)
+
+    def submit(self, windows):
+        future = concurrent.futures.Future()
+        self._queue.put((np.asarray(windows, dtype=np.float32), future))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, size = [item], len(item[0])
+            deadline = time.monotonic() + self.max_latency
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # Finish this batch, stop afterwards
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._execute(batch)
+
+    def _execute(self, batch):
+        # Windows of different lengths cannot be stacked: one forward pass per seq_len
+        groups = {}
+        for windows, future in batch:
+            groups.setdefault(windows.shape[1:], []).append((windows, future))
+        for group in groups.values():
+            try:
+                x = np.concatenate([windows for windows, _ in group])
+                scores = self.scorer(x)
+            except Exception as e:
+                for _, future in group:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.windows += len(x)
+            offset = 0
+            for windows, future in group:
+                future.set_result(scores[offset:offset + len(windows)])
+                offset += len(windows)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # Load tests open many connections at once
+
+def make_server(batcher, host="127.0.0.1", port=8000, timeout=30.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, so load generators reuse connections
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "batches": batcher.batches, "windows": batcher.windows})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                windows = np.asarray(request["windows"], dtype=np.float32)
+                if windows.ndim == 2:
+                    windows = windows[None]
+                if windows.ndim != 3 or windows.shape[2] != batcher.scorer.input_dim:
+                    raise ValueError(f"expected (N, seq_len, {batcher.scorer.input_dim}) windows, got {windows.shape}")
+                if windows.shape[1] < 1:
+                    raise ValueError("seq_len must be at least 1")
+            except (KeyError, TypeError, ValueError) as e:
+                self._reply(400, {"error": str(e)})
+                return
+            try:
+                risk = batcher.predict(windows, timeout)
+            except concurrent.futures.TimeoutError:
+                self._reply(504, {"error": f"no result within {timeout}s"})
+                return
+            except Exception as e:
+                self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self._reply(200, {"risk": risk.tolist()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return InferenceHTTPServer((host, port), Handler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve HealthRiskLSTM risk scores with dynamic micro-batching.")
+    parser.add_argument("--model", default=MODEL_PATH, help="Global model: parameters (.npz), TorchScript (.pt) or ONNX (.onnx)")
+    parser.add_argument("--quantize", action="store_true", help="Dynamic int8 quantization of an .npz model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Windows per forward pass")
+    parser.add_argument("--max-latency-ms", type=float, default=5.0, help="Longest a request waits for its batch to fill")
+    parser.add_argument("--threads", type=int, default=1, help="Intra-op threads of the model runtime (0 = library default)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds a request waits for its result before a 504")
+    args = parser.parse_args()
+    scorer = RiskScorer(args.model, quantize=args.quantize, threads=args.threads)
+    batcher = MicroBatcher(scorer, args.max_batch_size, args.max_latency_ms)
+    httpd = make_server(batcher, args.host, args.port, args.timeout)
+    print(f"[Inference] Serving {args.model} ({scorer.runtime}) on http://{args.host}:{httpd.server_address[1]}/predict "
+          f"(max batch {args.max_batch_size}, {args.max_latency_ms}ms budget)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        batcher.close()
+
+if __name__ == "__main__":
+    main()
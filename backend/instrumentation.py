@@ -0,0 +1,253 @@
+"""
+Round instrumentation for the Flower server.
+
+InstrumentedStrategy wraps any strategy and records, per round:
+- wall time from configure_fit to the end of evaluation,
+- the fit phase (instructions out -> results in) and the time spent in aggregate_fit,
+- serialized payload sizes (global model sent down, client updates received),
+- per-client fit/evaluate durations as reported by the clients,
+- the outputs of fit/evaluate metrics aggregation.
+
+Round rows go to data/logs/server_rounds.csv, per-client rows to
+data/logs/server_clients.csv, and the latest values are served in the
+Prometheus text format by MetricsExporter when the server runs with
+--metrics-port (e.g. http://127.0.0.1:9100/metrics).
+"""
+import csv
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from flwr.server.strategy import Strategy
+
+ROUND_LOG_PATH = "data/logs/server_rounds.csv"
+CLIENT_LOG_PATH = "data/logs/server_clients.csv"
+
+ROUND_FIELDS = ["round", "round_seconds", "fit_seconds", "aggregate_fit_seconds", "evaluate_seconds",
+                "fit_results", "fit_failures", "evaluate_results", "evaluate_failures",
+                "bytes_down", "bytes_up", "evaluate_loss", "fit_metrics", "evaluate_metrics"]
+CLIENT_FIELDS = ["round", "phase", "client", "cid", "duration_seconds", "bytes", "num_examples"]
+
+def parameters_bytes(parameters):
+    return sum(len(t) for t in parameters.tensors) if parameters is not None else 0
+
+class RoundRecorder:
+    """Appends round/client rows to CSV and keeps the latest values for the exporter."""
+    def __init__(self, round_log_path=ROUND_LOG_PATH, client_log_path=CLIENT_LOG_PATH, events=None, metrics=None):
+        self.lock = threading.Lock()
+        self.events = events
+        self.metrics = metrics
+        self.latest_round = {}
+        self.latest_clients = {}
+        self.totals = {"rounds": 0, "fit_failures": 0, "evaluate_failures": 0, "bytes_up": 0, "bytes_down": 0}
+        self.round_log_path = round_log_path
+        self.client_log_path = client_log_path
+        for path, fields in [(round_log_path, ROUND_FIELDS), (client_log_path, CLIENT_FIELDS)]:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", newline="") as f:
+                csv.writer(f).writerow(fields)
+
+    def record_clients(self, rows):
+        with open(self.client_log_path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CLIENT_FIELDS)
+            writer.writerows(rows)
+        if self.metrics is not None:
+            self.metrics.add_timings(rows)
+            self.metrics.flush()
+        with self.lock:
+            for row in rows:
+                self.latest_clients[(row["client"], row["phase"])] = row
+
+    def record_round(self, row):
+        out = dict(row)
+        out["fit_metrics"] = json.dumps(row.get("fit_metrics") or {}, default=str)
+        out["evaluate_metrics"] = json.dumps(row.get("evaluate_metrics") or {}, default=str)
+        with open(self.round_log_path, "a", newline="") as f:
+            csv.DictWriter(f, fieldnames=ROUND_FIELDS, extrasaction="ignore").writerow(out)
+        if self.metrics is not None:
+            self.metrics.add_round(row)
+            self.metrics.flush()
+        if self.events is not None:
+            self.events.emit("server_round", **{k: row.get(k) for k in ROUND_FIELDS if k not in ("fit_metrics", "evaluate_metrics")})
+        with self.lock:
+            self.latest_round = row
+            self.totals["rounds"] += 1
+            self.totals["fit_failures"] += row.get("fit_failures") or 0
+            self.totals["evaluate_failures"] += row.get("evaluate_failures") or 0
+            self.totals["bytes_up"] += row.get("bytes_up") or 0
+            self.totals["bytes_down"] += row.get("bytes_down") or 0
+
+    def prometheus_text(self):
+        with self.lock:
+            round_row = dict(self.latest_round)
+            clients = list(self.latest_clients.values())
+            totals = dict(self.totals)
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if value is None or value == "":
+                    continue
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_str}}} {float(value)}" if label_str else f"{name} {float(value)}")
+
+        metric("fl_rounds_total", "counter", "Completed federated rounds.", [({}, totals["rounds"])])
+        metric("fl_fit_failures_total", "counter", "Failed client fit calls.", [({}, totals["fit_failures"])])
+        metric("fl_evaluate_failures_total", "counter", "Failed client evaluate calls.", [({}, totals["evaluate_failures"])])
+        metric("fl_bytes_up_total", "counter", "Serialized client update bytes received.", [({}, totals["bytes_up"])])
+        metric("fl_bytes_down_total", "counter", "Serialized global model bytes sent.", [({}, totals["bytes_down"])])
+        metric("fl_round", "gauge", "Last completed round.", [({}, round_row.get("round"))])
+        for key, help_text in [("round_seconds", "Wall time of the last round."),
+                               ("fit_seconds", "Fit phase duration of the last round."),
+                               ("aggregate_fit_seconds", "Time spent in aggregate_fit in the last round."),
+                               ("evaluate_seconds", "Evaluate phase duration of the last round.")]:
+            metric(f"fl_last_{key}", "gauge", help_text, [({}, round_row.get(key))])
+        metric("fl_last_evaluate_loss", "gauge", "Aggregated evaluation loss of the last round.",
+               [({}, round_row.get("evaluate_loss"))])
+        metric("fl_client_duration_seconds", "gauge", "Last client-reported fit/evaluate duration.",
+               [({"client": row["client"], "phase": row["phase"]}, row["duration_seconds"]) for row in clients])
+        metric("fl_client_bytes", "gauge", "Last serialized update size per client.",
+               [({"client": row["client"]}, row["bytes"]) for row in clients if row["phase"] == "fit"])
+        return "\n".join(lines) + "\n"
+
+class MetricsExporter:
+    """Serves RoundRecorder.prometheus_text() on /metrics from a daemon thread."""
+    def __init__(self, recorder, host="127.0.0.1", port=9100):
+        recorder_ref = recorder
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder_ref.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        host, port = self.httpd.server_address[:2]
+        print(f"[Server] Metrics at http://{host}:{port}/metrics")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+
+def weighted_metrics_average(metrics):
+    """fit/evaluate_metrics_aggregation_fn: example-weighted mean of numeric client metrics,
+    plus the maximum of every *_duration_s (the round's straggler)."""
+    total = sum(num_examples for num_examples, _ in metrics)
+    sums, maxima = {}, {}
+    for num_examples, client_metrics in metrics:
+        for key, value in client_metrics.items():
+            if key in ("client_id", "base_round") or isinstance(value, (str, bytes, bool)):
+                continue
+            sums[key] = sums.get(key, 0.0) + num_examples * value
+            if key.endswith("_duration_s"):
+                maxima[f"max_{key}"] = max(maxima.get(f"max_{key}", value), value)
+    averaged = {key: value / total for key, value in sums.items()} if total else {}
+    averaged.update(maxima)
+    return averaged
+
+class InstrumentedStrategy(Strategy):
+    """Delegates to `strategy` and times/sizes every phase of each round."""
+    def __init__(self, strategy, recorder=None):
+        self.strategy = strategy
+        self.recorder = recorder or RoundRecorder()
+        self._round = {}
+
+    def __getattr__(self, name):
+        # Expose the wrapped strategy's attributes (e.g. bytes_history)
+        if name == "strategy":
+            raise AttributeError(name)
+        return getattr(self.strategy, name)
+
+    def flush(self):
+        # Record rounds still open when the server stops (e.g. no evaluation in the last round)
+        for pending in sorted(self._round):
+            self._finish_round(pending)
+
+    def _client_rows(self, server_round, phase, results, duration_key):
+        rows = []
+        for proxy, res in results:
+            metrics = res.metrics or {}
+            rows.append({
+                "round": server_round,
+                "phase": phase,
+                "client": metrics.get("client_id", proxy.cid),
+                "cid": proxy.cid,
+                "duration_seconds": metrics.get(duration_key, ""),
+                "bytes": parameters_bytes(res.parameters) if phase == "fit" else "",
+                "num_examples": res.num_examples,
+            })
+        return rows
+
+    def _finish_round(self, server_round):
+        row = self._round.pop(server_round, None)
+        if row is None:
+            return
+        row["round_seconds"] = time.perf_counter() - row.pop("_start")
+        row.pop("_evaluate_start", None)
+        self.recorder.record_round(row)
+
+    def initialize_parameters(self, client_manager):
+        return self.strategy.initialize_parameters(client_manager)
+
+    def configure_fit(self, server_round, parameters, client_manager):
+        # A previous round without federated evaluation ends when the next one starts
+        for pending in [r for r in self._round if r < server_round]:
+            self._finish_round(pending)
+        self._round[server_round] = {"round": server_round, "_start": time.perf_counter()}
+        instructions = self.strategy.configure_fit(server_round, parameters, client_manager)
+        self._round[server_round]["bytes_down"] = sum(parameters_bytes(ins.parameters) for _, ins in instructions)
+        return instructions
+
+    def aggregate_fit(self, server_round, results, failures):
+        row = self._round.setdefault(server_round, {"round": server_round, "_start": time.perf_counter()})
+        row["fit_seconds"] = time.perf_counter() - row["_start"]
+        row["fit_results"] = len(results)
+        row["fit_failures"] = len(failures)
+        row["bytes_up"] = sum(parameters_bytes(res.parameters) for _, res in results)
+        self.recorder.record_clients(self._client_rows(server_round, "fit", results, "fit_duration_s"))
+        start = time.perf_counter()
+        parameters, metrics = self.strategy.aggregate_fit(server_round, results, failures)
+        row["aggregate_fit_seconds"] = time.perf_counter() - start
+        row["fit_metrics"] = metrics
+        return parameters, metrics
+
+    def configure_evaluate(self, server_round, parameters, client_manager):
+        instructions = self.strategy.configure_evaluate(server_round, parameters, client_manager)
+        if server_round in self._round:
+            if instructions:
+                self._round[server_round]["_evaluate_start"] = time.perf_counter()
+            else:
+                self._finish_round(server_round)
+        return instructions
+
+    def aggregate_evaluate(self, server_round, results, failures):
+        loss, metrics = self.strategy.aggregate_evaluate(server_round, results, failures)
+        row = self._round.get(server_round)
+        if row is not None:
+            row["evaluate_seconds"] = time.perf_counter() - row.get("_evaluate_start", row["_start"])
+            row["evaluate_results"] = len(results)
+            row["evaluate_failures"] = len(failures)
+            row["evaluate_loss"] = loss
+            row["evaluate_metrics"] = metrics
+            self.recorder.record_clients(self._client_rows(server_round, "evaluate", results, "eval_duration_s"))
+            self._finish_round(server_round)
+        return loss, metrics
+
+    def evaluate(self, server_round, parameters):
+        return self.strategy.evaluate(server_round, parameters)
@@ -0,0 +1,197 @@
+"""
+Embedded metrics store: one SQLite database (data/logs/metrics.db) in WAL mode
+shared by the server, the clients, the simulation and the dashboard.
+
+Tables:
+- rounds:         one row per server round (timings, payload bytes, aggregated metrics)
+- client_metrics: training loss/accuracy per (client, round)
+- shap:           per-feature attributions per (client, round)
+- timings:        per-client fit/evaluate durations and update sizes per round
+
+Writers buffer rows and insert them with executemany in one transaction per
+flush(), i.e. once per round rather than once per row. WAL lets the dashboard
+read while clients write, and busy_timeout absorbs concurrent writers from
+separate client processes. The CSV logs are still written alongside for
+compatibility.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+from backend.utils.data_loader import FEATURE_COLUMNS
+
+METRICS_DB_PATH = "data/logs/metrics.db"
+
+ROUND_COLUMNS = ["round", "round_seconds", "fit_seconds", "aggregate_fit_seconds", "evaluate_seconds",
+                 "fit_results", "fit_failures", "evaluate_results", "evaluate_failures",
+                 "bytes_down", "bytes_up", "evaluate_loss", "fit_metrics", "evaluate_metrics"]
+TIMING_COLUMNS = ["client", "round", "phase", "cid", "duration_seconds", "bytes", "num_examples"]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS rounds (
+    round INTEGER PRIMARY KEY, round_seconds REAL, fit_seconds REAL, aggregate_fit_seconds REAL,
+    evaluate_seconds REAL, fit_results INTEGER, fit_failures INTEGER, evaluate_results INTEGER,
+    evaluate_failures INTEGER, bytes_down INTEGER, bytes_up INTEGER, evaluate_loss REAL,
+    fit_metrics TEXT, evaluate_metrics TEXT, ts REAL);
+CREATE TABLE IF NOT EXISTS client_metrics (
+    client INTEGER NOT NULL, round INTEGER NOT NULL, loss REAL, accuracy REAL, ts REAL,
+    PRIMARY KEY (client, round));
+CREATE INDEX IF NOT EXISTS client_metrics_round ON client_metrics (round);
+CREATE TABLE IF NOT EXISTS shap (
+    client INTEGER NOT NULL, round INTEGER NOT NULL, {", ".join(f"{c} REAL" for c in FEATURE_COLUMNS)}, ts REAL,
+    PRIMARY KEY (client, round));
+CREATE TABLE IF NOT EXISTS timings (
+    client INTEGER, round INTEGER, phase TEXT, cid TEXT, duration_seconds REAL, bytes INTEGER,
+    num_examples INTEGER, ts REAL);
+CREATE INDEX IF NOT EXISTS timings_client_round ON timings (client, round);
+"""
+
+def _client_key(client):
+    # Client ids are bound as integers in every table; a Flower cid used as a fallback id may not be one
+    try:
+        key = int(client)
+    except (TypeError, ValueError):
+        return str(client)
+    return key if -2**63 <= key < 2**63 else str(client)
+
+def _real(value):
+    # NaN/inf become NULL so that AVG() skips them like the CSV path does
+    if value is None or value == "":
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+class MetricsStore:
+    def __init__(self, path=METRICS_DB_PATH, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self._lock = threading.Lock()
+        self._pending = {"client_metrics": [], "shap": [], "timings": [], "rounds": []}
+
+    # --- writers (buffered until flush) ---
+
+    def add_client_metrics(self, client, server_round, loss, accuracy):
+        with self._lock:
+            self._pending["client_metrics"].append(
+                (_client_key(client), int(server_round), _real(loss), _real(accuracy), time.time()))
+
+    def add_shap(self, client, server_round, values):
+        with self._lock:
+            self._pending["shap"].append(
+                (_client_key(client), int(server_round), *[_real(v) for v in values], time.time()))
+
+    def add_timings(self, rows):
+        with self._lock:
+            for row in rows:
+                self._pending["timings"].append((
+                    _client_key(row["client"]), row["round"], row["phase"], str(row.get("cid", "")),
+                    _real(row.get("duration_seconds")), row.get("bytes") or None, row.get("num_examples"), time.time()))
+
+    def add_round(self, row):
+        values = []
+        for column in ROUND_COLUMNS:
+            value = row.get(column)
+            if column in ("fit_metrics", "evaluate_metrics"):
+                value = json.dumps(value or {}, default=str)
+            elif isinstance(value, float):
+                value = _real(value)
+            values.append(value)
+        with self._lock:
+            self._pending["rounds"].append((*values, time.time()))
+
+    def flush(self):
+        """Insert everything buffered since the last flush in a single transaction."""
+        with self._lock:
+            pending = {table: rows for table, rows in self._pending.items() if rows}
+            self._pending = {table: [] for table in self._pending}
+            if not pending:
+                return
+            statements = {
+                "client_metrics": "INSERT OR REPLACE INTO client_metrics VALUES (?, ?, ?, ?, ?)",
+                "shap": f"INSERT OR REPLACE INTO shap VALUES ({', '.join('?' * (len(FEATURE_COLUMNS) + 3))})",
+                "timings": "INSERT INTO timings VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                "rounds": f"INSERT OR REPLACE INTO rounds VALUES ({', '.join('?' * (len(ROUND_COLUMNS) + 1))})",
+            }
+            with self.conn:
+                for table, rows in pending.items():
+                    self.conn.executemany(statements[table], rows)
+
+    def reset_client(self, client):
+        # A client (re)starting replaces its rows, like reopening its CSV log with "w"
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM client_metrics WHERE client = ?", (_client_key(client),))
+            self.conn.execute("DELETE FROM shap WHERE client = ?", (_client_key(client),))
+
+    def reset_server(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM rounds")
+            self.conn.execute("DELETE FROM timings")
+
+    def reset(self):
+        with self._lock, self.conn:
+            for table in self._pending:
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def close(self):
+        if not self.readonly:
+            self.flush()
+        self.conn.close()
+
+    # --- queries (used by dashboard/app.py) ---
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def client_ids(self):
+        return self.query("SELECT DISTINCT client FROM client_metrics ORDER BY client")["client"].tolist()
+
+    def client_history(self, client):
+        return self.query("SELECT round, loss, accuracy FROM client_metrics WHERE client = ? ORDER BY round",
+                          (_client_key(client),))
+
+    def round_averages(self, column):
+        """Mean of `column` per round over the rounds every client has logged; NULLs (non-finite values) are skipped."""
+        if column not in ("loss", "accuracy"):
+            raise ValueError(f"Unknown client metric {column!r}")
+        return self.query(f"""
+            SELECT round, AVG({column}) AS avg_{column} FROM client_metrics GROUP BY round
+            HAVING COUNT(DISTINCT client) = (SELECT COUNT(DISTINCT client) FROM client_metrics)
+               AND AVG({column}) IS NOT NULL
+            ORDER BY round""")
+
+    def final_values(self, column):
+        """Metric at each client's last logged round, as a Series indexed by client id."""
+        if column not in ("loss", "accuracy"):
+            raise ValueError(f"Unknown client metric {column!r}")
+        df = self.query(f"""
+            SELECT m.client, m.{column} FROM client_metrics m
+            JOIN (SELECT client, MAX(round) AS round FROM client_metrics GROUP BY client) last
+              ON m.client = last.client AND m.round = last.round
+            WHERE m.{column} IS NOT NULL ORDER BY m.client""")
+        return df.set_index("client")[column]
+
+    def latest_shap(self, client):
+        df = self.query(f"SELECT {', '.join(FEATURE_COLUMNS)} FROM shap WHERE client = ? ORDER BY round DESC LIMIT 1",
+                        (_client_key(client),))
+        return None if df.empty else df.iloc[0].astype(float)
+
+    def rounds(self):
+        return self.query("SELECT * FROM rounds ORDER BY round")
+
+    def timings(self, client=None):
+        if client is None:
+            return self.query("SELECT * FROM timings ORDER BY round")
+        return self.query("SELECT * FROM timings WHERE client = ? ORDER BY round", (_client_key(client),))
@@ -4,7 +4,6 @@ Stub for LSTM/Temporal CNN model for time-series health risk prediction.
 """
 import torch
 import torch.nn as nn
-import pandas as pd
 
 class HealthRiskLSTM(nn.Module):
     def __init__(self, input_dim=5, hidden_dim=32, num_layers=1, output_dim=1):
@@ -18,8 +17,4 @@ class HealthRiskLSTM(nn.Module):
         out = self.fc(out[:, -1, :])
         return self.sigmoid(out)
 
-# Placeholder for Temporal CNN, if needed 
-
-sleep = pd.read_csv("fitabaseexampledata/SleepClassic/ID 1003_minuteSleep_20171001_20171007.csv")
-print(sleep.columns)
-print(sleep.head()) 
\ No newline at end of file
+# Placeholder for Temporal CNN, if needed
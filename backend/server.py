@@ -3,17 +3,124 @@
 Federated Learning Server (Flower-based)
 Orchestrates federated rounds and aggregates client updates.
 """
+import argparse
+import os
+import sys
 import flwr as fl
+from flwr.common import ndarrays_to_parameters
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.checkpoint import CHECKPOINT_DIR, Checkpointer, CheckpointedStrategy, resolve_checkpoint
+from backend.compression import CompressedFedAvg
+from backend.events import EVENTS_PATH, EventLog
+from backend.metrics_store import METRICS_DB_PATH, MetricsStore
+from backend.async_server import BufferedAsyncFedAvg, QuorumServer
+from backend.instrumentation import InstrumentedStrategy, MetricsExporter, RoundRecorder, weighted_metrics_average
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the federated server.")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds to run (with --resume: total rounds to reach)")
+    parser.add_argument("--min-clients", type=int, default=5)
+    parser.add_argument("--compress-bits", type=int, choices=[32, 16, 8], default=32,
+                        help="Quantization of client updates")
+    parser.add_argument("--topk", type=float, default=1.0,
+                        help="Fraction of entries per tensor clients send (requires --delta)")
+    parser.add_argument("--delta", action="store_true", help="Clients send weight deltas instead of full weights")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="Buffered aggregation: close a round once --quorum updates arrive instead of waiting for all clients")
+    parser.add_argument("--quorum", type=int, default=None, help="Updates per buffered round (default: --min-clients)")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Seconds after which a buffered round aggregates whatever has arrived")
+    parser.add_argument("--max-staleness", type=int, default=3, help="Drop buffered updates older than this many rounds")
+    parser.add_argument("--staleness-exponent", type=float, default=0.5,
+                        help="Stale updates are weighted by (1 + staleness) ** -exponent")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="Serve Prometheus /metrics on this 127.0.0.1 port, e.g. 9100 (default 0: disabled)")
+    parser.add_argument("--round-log", default="data/logs/server_rounds.csv", help="Per-round timing/bytes CSV")
+    parser.add_argument("--client-log", default="data/logs/server_clients.csv", help="Per-client timing/bytes CSV")
+    parser.add_argument("--events-path", default=EVENTS_PATH, help="JSON-lines event channel for the live dashboard ('' disables)")
+    parser.add_argument("--metrics-db", default=METRICS_DB_PATH, help="SQLite metrics store for rounds/timings ('' disables)")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="Checkpoint the global model every N rounds (0 disables)")
+    parser.add_argument("--keep-checkpoints", type=int, default=5, help="Newest checkpoints to keep (0 keeps all)")
+    parser.add_argument("--init-from", default=None,
+                        help="Warm start: seed the global model from a checkpoint .npz or 'latest'")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the latest checkpoint's run: its weights and round count, up to --rounds in total")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     print("[Server] Starting federated server...")
-    # Use FedAvg strategy
-    strategy = fl.server.strategy.FedAvg(
+    initial_arrays, round_offset, parent, run_id, num_rounds = None, 0, None, None, args.rounds
+    if args.resume or args.init_from:
+        found = resolve_checkpoint("latest" if args.resume else args.init_from, args.checkpoint_dir)
+        if found is None:
+            print(f"[Server] No checkpoint in {args.checkpoint_dir}; starting from random weights")
+        else:
+            initial_arrays, metadata = found
+            parent = metadata["file"] if metadata else args.init_from
+            if args.resume:
+                round_offset = metadata["round"]
+                run_id = metadata.get("run_id")
+                num_rounds = args.rounds - round_offset
+                print(f"[Server] Resuming after round {round_offset}; {max(num_rounds, 0)} rounds left")
+            else:
+                print(f"[Server] Warm start from {parent}")
+    if num_rounds <= 0:
+        print(f"[Server] Already at {round_offset} rounds; nothing to do")
+        return
+    strategy_kwargs = dict(
         fraction_fit=1.0,  # All clients participate
-        min_fit_clients=5,
-        min_available_clients=5,
+        min_fit_clients=args.min_clients,
+        min_available_clients=args.min_clients,
+        bits=args.compress_bits,
+        topk=args.topk,
+        delta=args.delta,
+        fit_metrics_aggregation_fn=weighted_metrics_average,
+        evaluate_metrics_aggregation_fn=weighted_metrics_average,
+        initial_parameters=ndarrays_to_parameters(initial_arrays) if initial_arrays is not None else None,
     )
-    fl.server.start_server(server_address="0.0.0.0:8080", config=fl.server.ServerConfig(num_rounds=3), strategy=strategy)
+    config = fl.server.ServerConfig(num_rounds=num_rounds)
+    if args.async_mode:
+        strategy = BufferedAsyncFedAvg(max_staleness=args.max_staleness, staleness_exponent=args.staleness_exponent,
+                                       **strategy_kwargs)
+    else:
+        # FedAvg with optional update compression
+        strategy = CompressedFedAvg(**strategy_kwargs)
+    events = EventLog(args.events_path) if args.events_path else None
+    if events is not None:
+        events.emit("run_start", source="server", rounds=args.rounds)
+    metrics = MetricsStore(args.metrics_db) if args.metrics_db else None
+    if metrics is not None:
+        metrics.reset_server()
+    if args.checkpoint_every > 0:
+        checkpointer = Checkpointer(args.checkpoint_dir, args.checkpoint_every, args.keep_checkpoints,
+                                    round_offset=round_offset, parent=parent, run_id=run_id)
+        strategy = CheckpointedStrategy(strategy, checkpointer, num_rounds)
+    recorder = RoundRecorder(args.round_log, args.client_log, events, metrics)
+    strategy = InstrumentedStrategy(strategy, recorder)
+    exporter = None
+    if args.metrics_port:
+        try:
+            exporter = MetricsExporter(recorder, port=args.metrics_port).start()
+        except OSError as e:
+            # A taken port should not stop training; metrics are still logged to CSV/SQLite
+            print(f"[Server] Warning: not serving /metrics on port {args.metrics_port}: {e}")
+    try:
+        if args.async_mode:
+            server = QuorumServer(client_manager=fl.server.SimpleClientManager(), strategy=strategy,
+                                  quorum=args.quorum or args.min_clients, deadline=args.deadline)
+            fl.server.start_server(server_address="0.0.0.0:8080", config=config, server=server)
+        else:
+            fl.server.start_server(server_address="0.0.0.0:8080", config=config, strategy=strategy)
+    finally:
+        strategy.flush()
+        if exporter is not None:
+            exporter.stop()
+        if events is not None:
+            events.close()
+        if metrics is not None:
+            metrics.close()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
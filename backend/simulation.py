@@ -0,0 +1,204 @@
+"""
+In-process federated simulation (no gRPC server, no per-client processes).
+
+Runs the FedAvg loop over many simulated clients with a pool of worker
+processes. Each worker loads torch once, keeps a single HealthRiskLSTM
+template and caches the DataLoaders of the last MAX_CACHED_LOADERS clients it
+has trained, so the cost per client per round is usually just the local epoch. Per-client metrics are
+written to data/logs/client_<id>_log.csv like the real clients, so the
+dashboard works unchanged.
+
+    python backend/simulation.py --num-clients 100 --rounds 3 --workers 8
+
+With --engine vectorized the local epochs of all clients run as one grouped
+forward/backward per step instead (see backend/vectorized.py).
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+import multiprocessing as mp
+from collections import OrderedDict
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from flwr.server.strategy.aggregate import aggregate
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.events import EventLog
+from backend.metrics_store import MetricsStore
+from backend.model import HealthRiskLSTM
+from backend.training import get_parameters, set_parameters, train_epoch
+from backend.vectorized import VectorizedTrainer
+from backend.utils.data_loader import get_dataloader, user_data_files, WindowedHealthDataset
+
+# Own database by default, so a simulation never replaces a real server run's rows in metrics.db
+SIMULATION_DB_NAME = "simulation_metrics.db"
+
+# Per-process state, filled by _init_worker (or lazily when running serially)
+_WORKER = {}
+# DataLoaders kept per worker, least recently used evicted first, so memory doesn't grow with the cohort
+MAX_CACHED_LOADERS = 32
+
+def client_data_paths(num_clients, processed_dir="data/processed"):
+    # Round-robin over the user files, same assignment as assign_client_data.py
+    user_csvs = user_data_files(processed_dir)
+    if not user_csvs:
+        raise FileNotFoundError(f"No user_*.csv or user_*.npz files in {processed_dir}")
+    return {cid: user_csvs[(cid - 1) % len(user_csvs)] for cid in range(1, num_clients + 1)}
+
+def _init_worker(loader_kwargs, lr):
+    # One intra-op thread per worker; parallelism comes from the pool
+    torch.set_num_threads(1)
+    _WORKER["model"] = HealthRiskLSTM()
+    _WORKER["criterion"] = nn.BCELoss()
+    _WORKER["loaders"] = OrderedDict()
+    _WORKER["loader_kwargs"] = loader_kwargs
+    _WORKER["lr"] = lr
+
+def _fit_client(task):
+    client_id, csv_path, parameters = task
+    loaders = _WORKER["loaders"]
+    if csv_path in loaders:
+        loaders.move_to_end(csv_path)
+    else:
+        loaders[csv_path] = get_dataloader(csv_path, **_WORKER["loader_kwargs"])
+        if len(loaders) > MAX_CACHED_LOADERS:
+            loaders.popitem(last=False)
+    loader = loaders[csv_path]
+    model = _WORKER["model"]
+    set_parameters(model, parameters)
+    # Fresh optimizer per round: clients are not pinned to workers, so Adam state can't persist
+    optimizer = optim.Adam(model.parameters(), lr=_WORKER["lr"])
+    loss, accuracy, _ = train_epoch(model, loader, _WORKER["criterion"], optimizer)
+    return client_id, get_parameters(model), len(loader.dataset), loss, accuracy
+
+class ClientLogs:
+    """Writes round,loss,accuracy rows to data/logs/client_<id>_log.csv (and the live event channel)."""
+    def __init__(self, client_ids, log_dir="data/logs", events=None, metrics=None):
+        os.makedirs(log_dir, exist_ok=True)
+        self.events = events
+        self.metrics = metrics
+        self.paths = {cid: os.path.join(log_dir, f"client_{cid}_log.csv") for cid in client_ids}
+        for path in self.paths.values():
+            with open(path, "w", newline="") as f:
+                csv.writer(f).writerow(["round", "loss", "accuracy"])
+
+    def append(self, client_id, server_round, loss, accuracy):
+        with open(self.paths[client_id], "a", newline="") as f:
+            csv.writer(f).writerow([server_round, loss, accuracy])
+        if self.events is not None:
+            self.events.emit("client_round", client=client_id, round=server_round, loss=loss, accuracy=accuracy)
+        if self.metrics is not None:
+            self.metrics.add_client_metrics(client_id, server_round, loss, accuracy)
+
+def _vectorized_runner(data_paths, lr, cache_dir=None, batch_size=32, seq_len=10, **_):
+    datasets = {}
+    for path in set(data_paths.values()):
+        datasets[path] = WindowedHealthDataset(path, seq_len, cache_dir)
+    # Clients without a single window would only add padding to every grouped step
+    client_ids = [cid for cid, path in data_paths.items() if len(datasets[path]) > 0]
+    empty_ids = [cid for cid in data_paths if cid not in client_ids]
+    trainer = VectorizedTrainer([datasets[data_paths[cid]] for cid in client_ids], batch_size=batch_size, lr=lr)
+
+    def run_tasks(tasks):
+        parameters = tasks[0][2]
+        results = [(cid, *result) for cid, result in zip(client_ids, trainer.fit_round(parameters))]
+        return results + [(cid, parameters, 0, 0, 0) for cid in empty_ids]
+    return run_tasks
+
+def run_simulation(num_clients=5, num_rounds=3, workers=None, processed_dir="data/processed",
+                   log_dir="data/logs", lr=0.001, seed=0, engine="pool", metrics_db=None, events_path=None,
+                   **loader_kwargs):
+    """metrics_db: SQLite metrics store (default <log_dir>/simulation_metrics.db, '' disables).
+    events_path: live event channel (default <log_dir>/events.jsonl, '' disables)."""
+    torch.manual_seed(seed)
+    data_paths = client_data_paths(num_clients, processed_dir)
+    if events_path is None:
+        events_path = os.path.join(log_dir, "events.jsonl")
+    events = EventLog(events_path) if events_path else None
+    if events is not None:
+        events.emit("run_start", source="simulation", rounds=num_rounds, clients=num_clients)
+    if metrics_db is None:
+        metrics_db = os.path.join(log_dir, SIMULATION_DB_NAME)
+    metrics = MetricsStore(metrics_db) if metrics_db else None
+    if metrics is not None:
+        # Replace the previous run's rounds and these clients' rows, as a restarted server and clients would
+        metrics.reset_server()
+        for client_id in data_paths:
+            metrics.reset_client(client_id)
+    logs = ClientLogs(data_paths.keys(), log_dir, events, metrics)
+    parameters = get_parameters(HealthRiskLSTM())
+    workers = os.cpu_count() if workers is None else workers
+
+    pool = None
+    if engine == "vectorized":
+        run_tasks = _vectorized_runner(data_paths, lr, **loader_kwargs)
+    elif workers > 0:
+        ctx = mp.get_context("spawn")
+        pool = ctx.Pool(workers, initializer=_init_worker, initargs=(loader_kwargs, lr))
+        run_tasks = lambda tasks: pool.imap_unordered(_fit_client, tasks)
+    else:
+        _init_worker(loader_kwargs, lr)
+        run_tasks = lambda tasks: map(_fit_client, tasks)
+
+    try:
+        for server_round in range(1, num_rounds + 1):
+            start = time.perf_counter()
+            tasks = [(cid, path, parameters) for cid, path in data_paths.items()]
+            results, total_loss, total_examples = [], 0.0, 0
+            for client_id, client_params, num_examples, loss, accuracy in run_tasks(tasks):
+                logs.append(client_id, server_round, loss, accuracy)
+                if num_examples > 0:
+                    results.append((client_params, num_examples))
+                    total_loss += loss * num_examples
+                    total_examples += num_examples
+            if results:
+                parameters = aggregate(results)
+            avg_loss = total_loss / total_examples if total_examples else float("nan")
+            round_seconds = time.perf_counter() - start
+            if metrics is not None:
+                # One transaction per round for every client's row
+                metrics.add_round({"round": server_round, "round_seconds": round_seconds,
+                                   "fit_results": len(results), "fit_metrics": {"loss": avg_loss}})
+                metrics.flush()
+            if events is not None:
+                events.emit("server_round", round=server_round, round_seconds=round_seconds,
+                            fit_results=len(results), fit_loss=avg_loss)
+            print(f"[Simulation] Round {server_round}: {len(results)}/{num_clients} clients, "
+                  f"weighted loss {avg_loss:.4f}, {time.perf_counter() - start:.2f}s")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if events is not None:
+            events.close()
+        if metrics is not None:
+            metrics.close()
+    return parameters
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an in-process federated simulation.")
+    parser.add_argument("--num-clients", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--engine", choices=["pool", "vectorized"], default="pool",
+                        help="pool: one process per worker; vectorized: all clients in one grouped LSTM pass")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (0 = run serially in-process)")
+    parser.add_argument("--processed-dir", default="data/processed")
+    parser.add_argument("--log-dir", default="data/logs")
+    parser.add_argument("--events-path", default=None,
+                        help="JSON-lines event channel for the live dashboard (default: <log-dir>/events.jsonl, '' disables)")
+    parser.add_argument("--metrics-db", default=None,
+                        help=f"SQLite metrics store (default: <log-dir>/{SIMULATION_DB_NAME}, '' disables)")
+    parser.add_argument("--lr", type=float, default=0.001)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-dir", default=None, help="Load data through the NPY cache in this directory")
+    parser.add_argument("--windowed", action="store_true", help="Use the strided windowed loader")
+    args = parser.parse_args()
+    print(f"[Simulation] Starting {args.num_clients} clients for {args.rounds} rounds...")
+    run_simulation(args.num_clients, args.rounds, args.workers, args.processed_dir, args.log_dir,
+                   args.lr, args.seed, args.engine, args.metrics_db, args.events_path, windowed=args.windowed,
+                   cache_dir=args.cache_dir)
+
+if __name__ == "__main__":
+    main()
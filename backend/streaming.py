@@ -0,0 +1,99 @@
+"""
+Stateful streaming scoring for live wearable feeds.
+
+Instead of re-running HealthRiskLSTM over a full seq_len window for every new
+observation, StreamingScorer keeps each patient's LSTM hidden/cell state and
+advances it one timestep per observation. All patients live in one batched
+state store ((layers, capacity, hidden) tensors plus a patient -> slot map),
+so a tick for thousands of patients is a single gathered LSTM-cell step and
+one Linear layer, O(1) per update regardless of history length.
+
+    scorer = StreamingScorer(load_eager("data/models/global_model.npz"))
+    risk = scorer.update(["p1", "p2"], [[0.5, 0.1, 0.7, 0.3, 0.9], [0.4, 0.2, 0.6, 0.2, 0.8]])
+
+Observations must be normalized like the training data. A new patient starts
+from the zero state, so its first seq_len scores match the windowed model on
+the same observations exactly; later scores condition on the full history
+rather than only the last seq_len steps.
+"""
+import numpy as np
+import torch
+
+class StreamingScorer:
+    def __init__(self, model, capacity=1024):
+        model.eval()
+        lstm = model.lstm
+        self.num_layers = lstm.num_layers
+        self.hidden = lstm.hidden_size
+        self.input_dim = lstm.input_size
+        with torch.no_grad():
+            # Transposed once so a step is addmm(bias, x, W); biases pre-summed
+            self.w_ih = [getattr(lstm, f"weight_ih_l{k}").detach().t().contiguous() for k in range(self.num_layers)]
+            self.w_hh = [getattr(lstm, f"weight_hh_l{k}").detach().t().contiguous() for k in range(self.num_layers)]
+            self.bias = [(getattr(lstm, f"bias_ih_l{k}") + getattr(lstm, f"bias_hh_l{k}")).detach()
+                         for k in range(self.num_layers)]
+            self.fc_w = model.fc.weight.detach().t().contiguous()
+            self.fc_b = model.fc.bias.detach()
+        self.h = torch.zeros(self.num_layers, capacity, self.hidden)
+        self.c = torch.zeros(self.num_layers, capacity, self.hidden)
+        self.steps = torch.zeros(capacity, dtype=torch.long)
+        self.slots = {}  # patient id -> row in the state tensors
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        capacity = self.h.shape[1]
+        self.h = torch.cat([self.h, torch.zeros_like(self.h)], dim=1)
+        self.c = torch.cat([self.c, torch.zeros_like(self.c)], dim=1)
+        self.steps = torch.cat([self.steps, torch.zeros_like(self.steps)])
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def _slot(self, patient_id):
+        slot = self.slots.get(patient_id)
+        if slot is None:
+            if not self.free:
+                self._grow()
+            slot = self.free.pop()
+            self.slots[patient_id] = slot
+        return slot
+
+    def update(self, patient_ids, observations):
+        """Advance each patient by one observation ((N, features)); returns their risk scores.
+        A patient may appear at most once per call."""
+        x = torch.as_tensor(np.asarray(observations, dtype=np.float32)).reshape(len(patient_ids), self.input_dim)
+        idx = torch.tensor([self._slot(p) for p in patient_ids], dtype=torch.long)
+        with torch.inference_mode():
+            for k in range(self.num_layers):
+                h, c = self.h[k, idx], self.c[k, idx]
+                gates = torch.addmm(self.bias[k], x, self.w_ih[k]).addmm_(h, self.w_hh[k])
+                i, f, g, o = gates.chunk(4, dim=1)  # PyTorch's LSTM gate order
+                c = torch.sigmoid(f) * c + torch.sigmoid(i) * torch.tanh(g)
+                h = torch.sigmoid(o) * torch.tanh(c)
+                self.h[k, idx], self.c[k, idx] = h, c
+                x = h
+            self.steps[idx] += 1
+            return torch.sigmoid(torch.addmm(self.fc_b, x, self.fc_w))[:, 0].numpy()
+
+    def score(self, patient_ids):
+        """Current risk of patients without advancing their state."""
+        idx = torch.tensor([self.slots[p] for p in patient_ids], dtype=torch.long)
+        with torch.inference_mode():
+            return torch.sigmoid(torch.addmm(self.fc_b, self.h[-1, idx], self.fc_w))[:, 0].numpy()
+
+    def reset(self, patient_id):
+        """Forget a patient's history; the next observation starts from the zero state."""
+        slot = self.slots.get(patient_id)
+        if slot is not None:
+            self.h[:, slot] = 0
+            self.c[:, slot] = 0
+            self.steps[slot] = 0
+
+    def remove(self, patient_id):
+        slot = self.slots.pop(patient_id, None)
+        if slot is not None:
+            self.h[:, slot] = 0
+            self.c[:, slot] = 0
+            self.steps[slot] = 0
+            self.free.append(slot)
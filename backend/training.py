@@ -0,0 +1,61 @@
+"""
+Local training/evaluation loops shared by the Flower client and the
+in-process simulation. Kept free of flwr/shap imports so worker processes
+stay cheap to start.
+"""
+import os
+import numpy as np
+import torch
+
+DEVICE = torch.device("cpu")
+
+def get_parameters(model):
+    return [val.cpu().numpy() for val in model.state_dict().values()]
+
+def set_parameters(model, parameters):
+    params_dict = zip(model.state_dict().keys(), parameters)
+    state_dict = {k: torch.tensor(v) for k, v in params_dict}
+    model.load_state_dict(state_dict, strict=True)
+
+def save_parameters(path, parameters):
+    # Positional arrays (arr_0, arr_1, ...) in state_dict order, like get_parameters
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, *parameters)
+
+def load_parameters(path):
+    with np.load(path) as npz:
+        return [npz[f"arr_{i}"] for i in range(len(npz.files))]
+
+def train_epoch(model, loader, criterion, optimizer):
+    model.train()
+    total_loss, correct, total = 0.0, 0, 0
+    first_batch = None
+    for xb, yb in loader:
+        xb, yb = xb.to(DEVICE), yb.to(DEVICE).unsqueeze(1)
+        optimizer.zero_grad()
+        preds = model(xb)
+        loss = criterion(preds, yb)
+        loss.backward()
+        optimizer.step()
+        total_loss += loss.item() * xb.size(0)
+        correct += ((preds > 0.5).float() == yb).sum().item()
+        total += xb.size(0)
+        if first_batch is None:
+            first_batch = xb.cpu()
+    avg_loss = total_loss / total if total > 0 else 0
+    accuracy = correct / total if total > 0 else 0
+    return avg_loss, accuracy, first_batch
+
+def evaluate_model(model, loader, criterion):
+    model.eval()
+    loss, correct, total = 0.0, 0, 0
+    with torch.no_grad():
+        for xb, yb in loader:
+            xb, yb = xb.to(DEVICE), yb.to(DEVICE).unsqueeze(1)
+            preds = model(xb)
+            loss += criterion(preds, yb).item() * xb.size(0)
+            correct += ((preds > 0.5).float() == yb).sum().item()
+            total += xb.size(0)
+    avg_loss = float(loss) / total if total > 0 else 0
+    accuracy = correct / total if total > 0 else 0
+    return avg_loss, total, accuracy
@@ -0,0 +1,105 @@
+"""
+Memory-mapped NPY cache for data/processed user files (.csv or .npz).
+
+Each user file is parsed once and its normalized features and labels are
+written to data/cache as .npy files, named user_<n>-<hash of the source
+path>, next to a small JSON sidecar recording the source file's size, mtime
+and SHA-256. Later loads map the .npy files
+without parsing. A changed mtime/size triggers a hash check, and the cache is
+rebuilt only if the content actually changed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+from backend.utils.data_loader import load_user_arrays, user_data_files
+
+CACHE_DIR = "data/cache"
+
+def cache_paths(csv_path, cache_dir=CACHE_DIR):
+    # Keyed by name plus a hash of the absolute path, so data/processed/user_1.csv and
+    # data/cohort/user_1.npz can share a cache dir without overwriting each other
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    source = hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:8]
+    base = os.path.join(cache_dir, f"{stem}-{source}")
+    return f"{base}.features.npy", f"{base}.labels.npy", f"{base}.meta.json"
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _source_stat(csv_path):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def _save_npy(path, array):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(meta_path, meta):
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+def convert_csv(csv_path, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    features_path, labels_path, meta_path = cache_paths(csv_path, cache_dir)
+    stat = _source_stat(csv_path)
+    features, labels = load_user_arrays(csv_path)
+    _save_npy(features_path, features)
+    _save_npy(labels_path, labels)
+    # Meta is written last so a crash mid-conversion leaves the entry stale
+    _write_meta(meta_path, {"source": csv_path, **stat, "sha256": file_sha256(csv_path), "rows": len(labels)})
+    return features_path, labels_path
+
+def is_fresh(csv_path, cache_dir=CACHE_DIR):
+    features_path, labels_path, meta_path = cache_paths(csv_path, cache_dir)
+    meta = _read_meta(meta_path)
+    if meta is None or not (os.path.exists(features_path) and os.path.exists(labels_path)):
+        return False
+    stat = _source_stat(csv_path)
+    if stat["size"] == meta.get("size") and stat["mtime_ns"] == meta.get("mtime_ns"):
+        return True
+    # Touched but possibly unchanged (e.g. a fresh checkout): fall back to the hash
+    if stat["size"] == meta.get("size") and file_sha256(csv_path) == meta.get("sha256"):
+        meta.update(stat)
+        _write_meta(meta_path, meta)
+        return True
+    return False
+
+def load_cached_arrays(csv_path, cache_dir=CACHE_DIR):
+    if not is_fresh(csv_path, cache_dir):
+        convert_csv(csv_path, cache_dir)
+    features_path, labels_path, _ = cache_paths(csv_path, cache_dir)
+    # Copy-on-write maps are writable, so torch.from_numpy can share them
+    return np.load(features_path, mmap_mode="c"), np.load(labels_path, mmap_mode="c")
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert user files to the memory-mapped NPY cache.")
+    parser.add_argument("--processed-dir", default="data/processed")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the cache is fresh")
+    args = parser.parse_args()
+    for csv_path in user_data_files(args.processed_dir):
+        if not args.force and is_fresh(csv_path, args.cache_dir):
+            print(f"[Cache] {csv_path} is up to date")
+            continue
+        convert_csv(csv_path, args.cache_dir)
+        print(f"[Cache] Converted {csv_path}")
+
+if __name__ == "__main__":
+    main()
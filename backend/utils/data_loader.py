@@ -1,26 +1,153 @@
+import os
 import pandas as pd
 import numpy as np
 import torch
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, IterableDataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler
+
+FEATURE_COLUMNS = ["heart_rate", "steps", "sleep", "stress_level", "spO2"]
+LABEL_COLUMN = "cardiovascular_risk"
+
+def user_data_files(processed_dir):
+    """Sorted user_* data files of a directory: all .csv or all .npz; mixing both is an error,
+    since user_1.csv and user_1.npz would otherwise count as two users."""
+    names = os.listdir(processed_dir) if os.path.isdir(processed_dir) else []
+    by_ext = {ext: sorted(n for n in names if n.startswith("user_") and n.endswith(ext)) for ext in (".csv", ".npz")}
+    if by_ext[".csv"] and by_ext[".npz"]:
+        raise ValueError(f"{processed_dir} holds both user_*.csv and user_*.npz files; keep one format per directory")
+    return [os.path.join(processed_dir, name) for name in by_ext[".csv"] or by_ext[".npz"]]
+
+def read_user_frame(path):
+    # .npz holds one array per column (data/process_fitabase.py output); anything else is CSV
+    if path.endswith(".npz"):
+        with np.load(path) as columns:
+            return pd.DataFrame({name: columns[name] for name in columns.files})
+    return pd.read_csv(path)
+
+def load_user_arrays(csv_path):
+    df = read_user_frame(csv_path)
+    features = df[FEATURE_COLUMNS].values.astype(np.float32)
+    labels = df[LABEL_COLUMN].values.astype(np.float32)
+    # Normalize features (min-max)
+    features = (features - features.min(axis=0)) / (features.max(axis=0) - features.min(axis=0) + 1e-8)
+    return features, labels
+
+def read_user_arrays(csv_path, cache_dir=None):
+    if cache_dir is None:
+        return load_user_arrays(csv_path)
+    from backend.utils.binary_cache import load_cached_arrays
+    return load_cached_arrays(csv_path, cache_dir)
 
 class HealthDataset(Dataset):
-    def __init__(self, csv_path, seq_len=10):
-        df = pd.read_csv(csv_path)
-        features = df[["heart_rate", "steps", "sleep", "stress_level", "spO2"]].values.astype(np.float32)
-        labels = df["cardiovascular_risk"].values.astype(np.float32)
-        # Normalize features (min-max)
-        self.features = (features - features.min(axis=0)) / (features.max(axis=0) - features.min(axis=0) + 1e-8)
-        self.labels = labels
+    def __init__(self, csv_path, seq_len=10, cache_dir=None):
+        self.features, self.labels = read_user_arrays(csv_path, cache_dir)
         self.seq_len = seq_len
 
     def __len__(self):
-        return len(self.features) - self.seq_len
+        return max(len(self.features) - self.seq_len, 0)
 
     def __getitem__(self, idx):
         x = self.features[idx:idx+self.seq_len]
         y = self.labels[idx+self.seq_len-1]
         return torch.tensor(x), torch.tensor(y)
 
-def get_dataloader(csv_path, batch_size=32, seq_len=10):
-    dataset = HealthDataset(csv_path, seq_len)
-    return DataLoader(dataset, batch_size=batch_size, shuffle=True) 
\ No newline at end of file
+class WindowedHealthDataset(Dataset):
+    """
+    Same windows as HealthDataset, but exposed as a strided view over one
+    contiguous feature tensor. Indexing with a batch of indices gathers the
+    whole batch in a single op instead of building one tensor per sample.
+    """
+    def __init__(self, csv_path, seq_len=10, cache_dir=None):
+        features, labels = read_user_arrays(csv_path, cache_dir)
+        self.features = torch.from_numpy(np.ascontiguousarray(features))
+        self.labels = torch.from_numpy(np.ascontiguousarray(labels))
+        self.seq_len = seq_len
+        # (num_windows, seq_len, num_features) view, no data is copied
+        if len(self.features) >= seq_len:
+            self.windows = self.features.unfold(0, seq_len, 1).transpose(1, 2)
+        else:
+            self.windows = self.features.new_empty((0, seq_len, self.features.shape[1]))
+        self.window_labels = self.labels[seq_len-1:]
+
+    def __len__(self):
+        return max(len(self.features) - self.seq_len, 0)
+
+    def __getitem__(self, idx):
+        idx = torch.as_tensor(idx, dtype=torch.long)
+        return self.windows[idx], self.window_labels[idx]
+
+class StreamingHealthDataset(IterableDataset):
+    """
+    Reads the user CSV in chunks so peak memory is bounded by `chunksize`
+    rather than the file size. Min/max statistics and the row count come from
+    one streaming pass at construction; each epoch then re-reads the file and
+    yields whole batches. The last seq_len-1 rows of every chunk are carried
+    into the next one so windows spanning a chunk boundary match HealthDataset.
+    Shuffling is done within each chunk only. An .npz user file is loaded
+    whole and then sliced into the same chunks, so only CSVs bound memory.
+    """
+    def __init__(self, csv_path, seq_len=10, batch_size=32, chunksize=100_000, shuffle=True):
+        self.csv_path = csv_path
+        self.seq_len = seq_len
+        self.batch_size = batch_size
+        self.chunksize = chunksize
+        self.shuffle = shuffle
+        self.feat_min, self.feat_max, self.num_rows = self._scan_stats()
+
+    def _chunks(self):
+        if self.csv_path.endswith(".npz"):
+            # NPZ columns cannot be read partially; slice the loaded frame so the windowing is unchanged
+            df = read_user_frame(self.csv_path)[FEATURE_COLUMNS + [LABEL_COLUMN]]
+            return (df.iloc[start:start + self.chunksize] for start in range(0, len(df), self.chunksize))
+        return pd.read_csv(self.csv_path, usecols=FEATURE_COLUMNS + [LABEL_COLUMN], chunksize=self.chunksize)
+
+    def _scan_stats(self):
+        feat_min = np.full(len(FEATURE_COLUMNS), np.inf, dtype=np.float32)
+        feat_max = np.full(len(FEATURE_COLUMNS), -np.inf, dtype=np.float32)
+        num_rows = 0
+        for chunk in self._chunks():
+            features = chunk[FEATURE_COLUMNS].values.astype(np.float32)
+            feat_min = np.minimum(feat_min, features.min(axis=0))
+            feat_max = np.maximum(feat_max, features.max(axis=0))
+            num_rows += len(features)
+        return feat_min, feat_max, num_rows
+
+    def __len__(self):
+        return max(self.num_rows - self.seq_len, 0)
+
+    def __iter__(self):
+        total = len(self)
+        emitted = 0
+        tail_x = np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+        tail_y = np.empty(0, dtype=np.float32)
+        for chunk in self._chunks():
+            features = chunk[FEATURE_COLUMNS].values.astype(np.float32)
+            features = (features - self.feat_min) / (self.feat_max - self.feat_min + 1e-8)
+            x = np.concatenate([tail_x, features])
+            y = np.concatenate([tail_y, chunk[LABEL_COLUMN].values.astype(np.float32)])
+            keep = max(len(x) - self.seq_len + 1, 0)
+            tail_x, tail_y = x[keep:].copy(), y[keep:].copy()
+            num_windows = min(len(x) - self.seq_len + 1, total - emitted)
+            if num_windows <= 0:
+                continue
+            xt = torch.from_numpy(x)
+            windows = xt.unfold(0, self.seq_len, 1).transpose(1, 2)
+            window_labels = torch.from_numpy(y)[self.seq_len-1:]
+            order = torch.randperm(num_windows) if self.shuffle else torch.arange(num_windows)
+            for start in range(0, num_windows, self.batch_size):
+                idx = order[start:start+self.batch_size]
+                yield windows[idx], window_labels[idx]
+            emitted += num_windows
+
+def get_dataloader(csv_path, batch_size=32, seq_len=10, windowed=False, shuffle=True, streaming=False, chunksize=100_000, cache_dir=None):
+    # cache_dir: map features/labels from the NPY cache (see binary_cache) instead of parsing the CSV
+    if streaming:
+        dataset = StreamingHealthDataset(csv_path, seq_len, batch_size, chunksize, shuffle)
+        return DataLoader(dataset, batch_size=None)
+    if windowed:
+        dataset = WindowedHealthDataset(csv_path, seq_len, cache_dir)
+        sampler = RandomSampler(dataset) if shuffle and len(dataset) > 0 else SequentialSampler(dataset)
+        # batch_size=None: the sampler yields index lists and the dataset returns whole batches
+        return DataLoader(dataset, batch_size=None, sampler=BatchSampler(sampler, batch_size, drop_last=False))
+    dataset = HealthDataset(csv_path, seq_len, cache_dir)
+    # RandomSampler rejects empty datasets (user files shorter than seq_len)
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle and len(dataset) > 0)
@@ -0,0 +1,142 @@
+"""
+Vectorized local training for many clients at once.
+
+The parameters of K clients are stacked along a leading client dimension and
+trained together: one grouped LSTM forward/backward per step covers a batch
+from every client, so a round of local updates for K small clients costs
+roughly as much wall-clock as one. The LSTM is written out with batched
+matmuls (PyTorch gate order i, f, g, o) because nn.LSTM has no grouped-weight
+mode. Each client's loss only depends on its own parameter slice, so summing
+the losses yields exactly the per-client gradients; the Adam step is
+elementwise and masked per client, so clients that have run out of batches
+are left untouched, matching independent per-client training.
+
+Results come back as per-client lists of NumPy arrays in state_dict order,
+i.e. the same layout FLClient.get_parameters sends to FedAvg.
+"""
+import math
+import numpy as np
+import torch
+from backend.model import HealthRiskLSTM
+
+class VectorizedTrainer:
+    def __init__(self, datasets, batch_size=32, lr=0.001, betas=(0.9, 0.999), eps=1e-8, shuffle=True):
+        # datasets: WindowedHealthDataset per client, all with the same seq_len
+        template = HealthRiskLSTM()
+        self.keys = list(template.state_dict().keys())
+        self.num_layers = template.lstm.num_layers
+        self.hidden_dim = template.lstm.hidden_size
+        self.num_clients = len(datasets)
+        self.batch_size = batch_size
+        self.lr, self.betas, self.eps = lr, betas, eps
+        self.shuffle = shuffle
+        self.seq_len = datasets[0].seq_len if datasets else 0
+
+        # Concatenate every client's series and take one strided window view;
+        # client k owns the windows starting at offsets[k] .. offsets[k] + sizes[k] - 1
+        lengths = [len(ds.features) for ds in datasets]
+        self.sizes = torch.tensor([len(ds) for ds in datasets], dtype=torch.long)
+        self.offsets = torch.tensor([0] + lengths[:-1], dtype=torch.long).cumsum(0)
+        features = torch.cat([ds.features for ds in datasets]) if datasets else torch.empty(0)
+        self.labels = torch.cat([ds.labels for ds in datasets]) if datasets else torch.empty(0)
+        if len(features) >= self.seq_len > 0:
+            self.windows = features.unfold(0, self.seq_len, 1).transpose(1, 2)
+        else:
+            self.windows = features.new_empty((0, self.seq_len, 0))
+
+    def stack(self, parameters):
+        # Broadcast the global parameters to every client
+        return {k: torch.tensor(np.asarray(v)).unsqueeze(0).repeat(self.num_clients, *[1] * np.ndim(v)).requires_grad_()
+                for k, v in zip(self.keys, parameters)}
+
+    def unstack(self, params):
+        return [[params[k][i].detach().numpy().copy() for k in self.keys] for i in range(self.num_clients)]
+
+    def forward(self, params, x):
+        # x: (K, B, T, F) -> risk (K, B)
+        K, B, T, _ = x.shape
+        layer_input = x
+        for layer in range(self.num_layers):
+            w_ih, w_hh = params[f"lstm.weight_ih_l{layer}"], params[f"lstm.weight_hh_l{layer}"]
+            bias = params[f"lstm.bias_ih_l{layer}"] + params[f"lstm.bias_hh_l{layer}"]
+            # Input projection for all timesteps at once: (K, B*T, 4H)
+            gates_x = torch.baddbmm(bias.unsqueeze(1), layer_input.reshape(K, B * T, -1), w_ih.transpose(1, 2))
+            gates_x = gates_x.view(K, B, T, -1)
+            h = x.new_zeros(K, B, self.hidden_dim)
+            c = x.new_zeros(K, B, self.hidden_dim)
+            outputs = []
+            w_hh_t = w_hh.transpose(1, 2)
+            for t in range(T):
+                gates = gates_x[:, :, t] + torch.bmm(h, w_hh_t)
+                i, f, g, o = gates.chunk(4, dim=-1)
+                c = torch.sigmoid(f) * c + torch.sigmoid(i) * torch.tanh(g)
+                h = torch.sigmoid(o) * torch.tanh(c)
+                outputs.append(h)
+            layer_input = torch.stack(outputs, dim=2)
+        out = torch.baddbmm(params["fc.bias"].unsqueeze(1), h, params["fc.weight"].transpose(1, 2))
+        return torch.sigmoid(out).squeeze(-1)
+
+    def _batches(self):
+        # Yields (global window indices (K, B), validity mask (K, B)) per step
+        K, bs = self.num_clients, self.batch_size
+        steps = int(math.ceil(self.sizes.max().item() / bs)) if K else 0
+        perms = [torch.randperm(n) if self.shuffle else torch.arange(n) for n in self.sizes.tolist()]
+        for step in range(steps):
+            idx = torch.zeros(K, bs, dtype=torch.long)
+            mask = torch.zeros(K, bs, dtype=torch.bool)
+            for k, perm in enumerate(perms):
+                chunk = perm[step * bs:(step + 1) * bs]
+                idx[k, :len(chunk)] = chunk + self.offsets[k]
+                mask[k, :len(chunk)] = True
+            yield idx, mask
+
+    def _adam_step(self, params, state, active):
+        beta1, beta2 = self.betas
+        state["step"] += active.long()
+        step = state["step"].clamp(min=1).double()
+        bias_correction1 = (1 - beta1 ** step).float()
+        bias_correction2_sqrt = (1 - beta2 ** step).sqrt().float()
+        with torch.no_grad():
+            for k, p in params.items():
+                shape = (-1,) + (1,) * (p.dim() - 1)
+                mask = active.view(shape)
+                m, v = state["exp_avg"][k], state["exp_avg_sq"][k]
+                g = p.grad
+                m.copy_(torch.where(mask, beta1 * m + (1 - beta1) * g, m))
+                v.copy_(torch.where(mask, beta2 * v + (1 - beta2) * g * g, v))
+                denom = v.sqrt() / bias_correction2_sqrt.view(shape) + self.eps
+                update = (self.lr / bias_correction1.view(shape)) * m / denom
+                p.sub_(torch.where(mask, update, torch.zeros_like(update)))
+                p.grad = None
+
+    def fit_round(self, parameters):
+        """One local epoch for every client from the same global parameters.
+
+        Returns a list of (parameters, num_examples, loss, accuracy) per client.
+        """
+        params = self.stack(parameters)
+        state = {
+            "step": torch.zeros(self.num_clients, dtype=torch.long),
+            "exp_avg": {k: torch.zeros_like(p) for k, p in params.items()},
+            "exp_avg_sq": {k: torch.zeros_like(p) for k, p in params.items()},
+        }
+        total_loss = torch.zeros(self.num_clients, dtype=torch.float64)
+        correct = torch.zeros(self.num_clients, dtype=torch.float64)
+        for idx, mask in self._batches():
+            xb = self.windows[idx]
+            yb = self.labels[idx + self.seq_len - 1]
+            preds = self.forward(params, xb)
+            weights = mask.float()
+            counts = weights.sum(dim=1)
+            per_sample = torch.nn.functional.binary_cross_entropy(preds, yb, reduction="none")
+            # Mean over each client's valid samples (nn.BCELoss semantics), summed over clients
+            client_loss = (per_sample * weights).sum(dim=1) / counts.clamp(min=1)
+            client_loss.sum().backward()
+            self._adam_step(params, state, counts > 0)
+            total_loss += (client_loss.detach() * counts).double()
+            correct += (((preds.detach() > 0.5).float() == yb).float() * weights).sum(dim=1).double()
+        sizes = self.sizes.double()
+        losses = torch.where(sizes > 0, total_loss / sizes.clamp(min=1), torch.zeros_like(sizes))
+        accuracies = torch.where(sizes > 0, correct / sizes.clamp(min=1), torch.zeros_like(sizes))
+        return [(client_params, int(n), float(loss), float(acc))
+                for client_params, n, loss, acc in zip(self.unstack(params), self.sizes.tolist(), losses, accuracies)]
@@ -0,0 +1,61 @@
+"""
+Benchmark: wall time and agreement of the batched attribution engines
+(integrated gradients, gradient x input) against shap.DeepExplainer.
+
+The model is trained for a few epochs on one client's windows, the windows
+are summarized into a k-means background, and each engine explains the same
+sample. Agreement is reported as the Pearson correlation of per-feature
+importance and the mean per-window cosine similarity with DeepExplainer.
+"""
+import argparse
+import os
+import sys
+import time
+import torch
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.attribution import attribute, feature_importance, kmeans_background
+from backend.explain import sample_windows
+from backend.model import HealthRiskLSTM
+from backend.training import train_epoch
+from backend.utils.data_loader import get_dataloader
+
+def cosine_per_window(a, b):
+    a, b = a.reshape(len(a), -1), b.reshape(len(b), -1)
+    return torch.nn.functional.cosine_similarity(a, b, dim=1).mean().item()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare attribution engines against DeepExplainer.")
+    parser.add_argument("--csv", default="data/processed/user_1.csv")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--explain-size", type=int, default=512, help="Windows to explain")
+    parser.add_argument("--background-k", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=32, help="Integrated-gradients interpolation steps")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    loader = get_dataloader(args.csv, batch_size=32, windowed=True)
+    model = HealthRiskLSTM()
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    for _ in range(args.epochs):
+        train_epoch(model, loader, torch.nn.BCELoss(), optimizer)
+
+    windows = sample_windows(loader.dataset, args.explain_size)
+    background, weights = kmeans_background(windows, args.background_k)
+    print(f"[Bench] Explaining {len(windows)} windows against {len(background)} background centroids")
+
+    results = {}
+    for method, kwargs in [("deep_shap", {}), ("integrated_gradients", {"steps": args.steps}), ("gradient_x_input", {})]:
+        start = time.perf_counter()
+        attributions = attribute(model, windows, background, weights, method=method, **kwargs).float()
+        results[method] = (time.perf_counter() - start, attributions)
+
+    ref_seconds, ref = results["deep_shap"]
+    ref_importance = torch.from_numpy(feature_importance(ref))
+    for method, (seconds, attributions) in results.items():
+        importance = torch.from_numpy(feature_importance(attributions))
+        corr = torch.corrcoef(torch.stack([importance, ref_importance]))[0, 1].item()
+        print(f"[Bench] {method:>20}: {seconds:7.3f}s ({ref_seconds / seconds:5.1f}x), "
+              f"importance corr {corr:.3f}, window cosine {cosine_per_window(attributions, ref):.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmark: synthetic cohort generation, one DataFrame copy + CSV per user
+(make_synthetic_users) vs batched shards from generate_cohort (NPZ and CSV).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from data.generate_dataset import generate_cohort
+
+def per_user_copies(num_users, rows, out_dir):
+    base = pd.DataFrame({"heart_rate": np.random.uniform(60, 100, rows), "steps": np.random.uniform(0, 200, rows),
+                         "sleep": np.random.uniform(4, 9, rows), "stress_level": np.random.uniform(0, 1, rows),
+                         "spO2": np.random.uniform(95, 100, rows), "cardiovascular_risk": np.random.uniform(0, 1, rows)})
+    for i in range(1, num_users + 1):
+        user_df = base.copy()
+        for column in user_df.columns:
+            user_df[column] += np.random.normal(0, 0.05, rows)
+        user_df.to_csv(os.path.join(out_dir, f"user_{i}.csv"), index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-user vs batched cohort generation.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    total = args.users * args.rows
+    start = time.perf_counter()
+    per_user_copies(args.users, args.rows, tempfile.mkdtemp())
+    seconds = time.perf_counter() - start
+    print(f"[Bench] per-user copies, CSV : {seconds:6.2f}s ({total / seconds:12,.0f} rows/s)")
+    for fmt in ["csv", "npz"]:
+        start = time.perf_counter()
+        generate_cohort(args.users, args.rows, out_dir=tempfile.mkdtemp(), workers=args.workers, fmt=fmt)
+        seconds = time.perf_counter() - start
+        print(f"[Bench] batched shards, {fmt.upper()}  : {seconds:6.2f}s ({total / seconds:12,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark: samples/sec of the per-item HealthDataset loader vs the strided
+WindowedHealthDataset loader over one full epoch.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.utils.data_loader import get_dataloader, FEATURE_COLUMNS, LABEL_COLUMN
+
+def make_synthetic_csv(path, num_rows):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((num_rows, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    df[LABEL_COLUMN] = rng.random(num_rows)
+    df.to_csv(path, index=False)
+
+def run_epoch(loader):
+    start = time.perf_counter()
+    samples = 0
+    for xb, yb in loader:
+        samples += xb.size(0)
+    return samples / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HealthDataset loader throughput.")
+    parser.add_argument("--csv", help="User CSV to load (default: generate a synthetic one)")
+    parser.add_argument("--rows", type=int, default=200_000, help="Rows in the synthetic CSV")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seq-len", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    csv_path = args.csv
+    if csv_path is None:
+        csv_path = os.path.join(tempfile.mkdtemp(), "bench_user.csv")
+        make_synthetic_csv(csv_path, args.rows)
+
+    results = {}
+    for name, windowed in [("per-item", False), ("windowed", True)]:
+        loader = get_dataloader(csv_path, batch_size=args.batch_size, seq_len=args.seq_len, windowed=windowed)
+        results[name] = max(run_epoch(loader) for _ in range(args.repeats))
+        print(f"[Bench] {name:>9}: {results[name]:,.0f} samples/sec ({len(loader.dataset):,} windows)")
+    print(f"[Bench] speedup: {results['windowed'] / results['per-item']:.1f}x")
+
+if __name__ == "__main__":
+    main()
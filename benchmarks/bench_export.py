@@ -0,0 +1,80 @@
+"""
+Benchmark: eager vs TorchScript vs ONNX Runtime vs dynamic int8 HealthRiskLSTM
+on CPU. Reports single-window latency, batched throughput, accuracy and the
+largest score difference from the eager float model.
+
+The model is trained for a few epochs on one client's windows first so the
+accuracy comparison is meaningful. ONNX is skipped when onnx/onnxruntime are
+not installed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import torch
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.export import RiskScorer, export_onnx, export_torchscript, quantize_model
+from backend.model import HealthRiskLSTM
+from backend.training import get_parameters, save_parameters, train_epoch
+from backend.utils.data_loader import get_dataloader
+
+def median_latency(scorer, x, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scorer(x)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare exported HealthRiskLSTM runtimes.")
+    parser.add_argument("--csv", default="data/processed/user_1.csv")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--eval-windows", type=int, default=4096)
+    parser.add_argument("--batch-size", type=int, default=256, help="Batch for the throughput measurement")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    loader = get_dataloader(args.csv, batch_size=32, windowed=True)
+    model = HealthRiskLSTM()
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    for _ in range(args.epochs):
+        train_epoch(model, loader, torch.nn.BCELoss(), optimizer)
+    model.eval()
+
+    out_dir = tempfile.mkdtemp()
+    npz_path = os.path.join(out_dir, "model.npz")
+    save_parameters(npz_path, get_parameters(model))
+    candidates = [("eager", npz_path, False), ("eager int8", npz_path, True),
+                  ("torchscript", export_torchscript(model, os.path.join(out_dir, "model.pt")), False),
+                  ("torchscript int8", export_torchscript(quantize_model(model), os.path.join(out_dir, "model.int8.pt")), False)]
+    try:
+        candidates.append(("onnxruntime", export_onnx(model, os.path.join(out_dir, "model.onnx")), False))
+        import onnxruntime  # noqa: F401
+    except ImportError as e:
+        print(f"[Bench] Skipping ONNX: {e}")
+        candidates = [c for c in candidates if c[0] != "onnxruntime"]
+
+    dataset = loader.dataset
+    idx = torch.randperm(len(dataset), generator=torch.Generator().manual_seed(1))[:args.eval_windows]
+    windows, labels = dataset[idx]
+    windows, labels = windows.numpy(), labels.numpy()
+    reference = None
+    for name, path, quantize in candidates:
+        scorer = RiskScorer(path, quantize=quantize, threads=args.threads)
+        scores = scorer(windows)
+        if reference is None:
+            reference = scores
+        accuracy = float(((scores > 0.5) == labels).mean())
+        single = median_latency(scorer, windows[:1], args.repeats)
+        batched = median_latency(scorer, windows[:args.batch_size], max(args.repeats // 10, 5))
+        print(f"[Bench] {name:>16}: 1 window {single * 1e3:6.3f}ms, {args.batch_size} windows {batched * 1e3:7.3f}ms "
+              f"({args.batch_size / batched:9,.0f} windows/s), accuracy {accuracy:.4f}, "
+              f"max |diff| {np.abs(scores - reference).max():.2e}")
+
+if __name__ == "__main__":
+    main()
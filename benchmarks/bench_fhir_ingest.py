@@ -0,0 +1,50 @@
+"""
+Benchmark: FHIR ingestion throughput against the local stub server with
+emulated network latency, one worker (serial) vs a pooled, concurrent run,
+plus one Bulk Data $export of the same population.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend import fhir_bulk, fhir_integration
+from backend.fhir_stub import StubFHIRData, start_in_thread
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial vs concurrent FHIR ingestion.")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--observations", type=int, default=60)
+    parser.add_argument("--page-size", type=int, default=20, help="Small pages exercise Bundle pagination")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--workers", default="1,16")
+    args = parser.parse_args()
+
+    httpd, base_url = start_in_thread(StubFHIRData(args.patients, args.observations),
+                                      latency_ms=args.latency_ms, error_rate=args.error_rate)
+    fhir_integration.FHIR_BASE_URL = base_url
+    for workers in [int(w) for w in args.workers.split(",")]:
+        out_dir = tempfile.mkdtemp()
+        requests_before = httpd.stats["requests"]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            written = fhir_integration.fhir_to_timeseries_csv(workers, args.page_size, out_dir)
+        seconds = time.perf_counter() - start
+        print(f"[Bench] {workers:>3} workers: {args.patients / seconds:7.1f} patients/s, {written} CSVs, "
+              f"{httpd.stats['requests'] - requests_before} requests in {seconds:.1f}s")
+    requests_before = httpd.stats["requests"]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        written = fhir_bulk.bulk_export_to_csv(base_url, tempfile.mkdtemp())
+    seconds = time.perf_counter() - start
+    print(f"[Bench] bulk $export: {args.patients / seconds:7.1f} patients/s, {written} CSVs, "
+          f"{httpd.stats['requests'] - requests_before} requests in {seconds:.1f}s")
+    print(f"[Bench] {httpd.stats['errors']} injected 503s were retried")
+    httpd.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: turning one patient's Observation Bundle entries into the daily
+MODEL_FEATURES frame, per-observation dicts + defaultdict grouping (the
+previous implementation) vs columnar flattening and one pivot.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.fhir_integration import FHIR_TO_MODEL, MODEL_FEATURES, observations_to_frame
+from backend.fhir_stub import StubFHIRData
+
+# The previous per-observation parser, kept here as the reference implementation
+def parse_observation(obs):
+    resource = obs['resource']
+    code = resource.get('code', {}).get('text', '')
+    value = resource.get('valueQuantity', {}).get('value', None)
+    date = resource.get('effectiveDateTime', '')
+    if date:
+        date = date[:10]  # Use only YYYY-MM-DD
+    return {'date': date, 'type': code, 'value': value}
+
+def dict_frame(obs_entries):
+    by_date = defaultdict(dict)
+    for obs in [parse_observation(o) for o in obs_entries if parse_observation(o)['type'] in FHIR_TO_MODEL]:
+        if obs['date'] and obs['value'] is not None:
+            by_date[obs['date']][FHIR_TO_MODEL[obs['type']]] = obs['value']
+    rows = []
+    for date, feats in by_date.items():
+        row = {'date': date}
+        for f in MODEL_FEATURES:
+            row[f] = feats.get(f, np.nan)
+        row['cardiovascular_risk'] = float(np.random.rand() > 0.5)
+        rows.append(row)
+    return pd.DataFrame(rows).sort_values('date').reset_index(drop=True)
+
+def best_of(fn, entries, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df = fn(entries)
+        times.append(time.perf_counter() - start)
+    return min(times), df
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dict-based vs vectorized Observation parsing.")
+    parser.add_argument("--observations", default="1000,10000,50000", help="Observations per patient")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in [int(x) for x in args.observations.split(",")]:
+        entries = [{"resource": r} for r in StubFHIRData(1, n).observations("stub-0")]
+        dict_seconds, expected = best_of(dict_frame, entries, args.repeats)
+        columnar_seconds, actual = best_of(observations_to_frame, entries, args.repeats)
+        pd.testing.assert_frame_equal(actual[['date'] + MODEL_FEATURES], expected[['date'] + MODEL_FEATURES],
+                                      check_dtype=False)
+        print(f"[Bench] {n:>7,} observations: dicts {dict_seconds * 1e3:8.1f}ms, "
+              f"columnar {columnar_seconds * 1e3:7.1f}ms ({dict_seconds / columnar_seconds:.1f}x), "
+              f"{len(actual):,} days")
+
+if __name__ == "__main__":
+    main()
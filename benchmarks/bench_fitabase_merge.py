@@ -0,0 +1,62 @@
+"""
+Benchmark: merging one Fitabase participant's minute-level streams with
+format-inferring pd.to_datetime + chained hash merges (the previous
+load_and_merge) vs explicit-format parsing, binning and as-of joins, plus
+the seconds-level heart rate path the old merge could not use.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from data.fitabase import discover, load_participant, write_example_participant
+
+def hash_merge(files):
+    hr = pd.read_csv(files['heart_rate'][0])
+    steps = pd.read_csv(files['steps'][0])
+    sleep = pd.read_csv(files['sleep'][0])
+    cal = pd.read_csv(files['calories'][0])
+    intensity = pd.read_csv(files['intensity'][0])
+    hr['timestamp'] = pd.to_datetime(hr['Time'])
+    steps['timestamp'] = pd.to_datetime(steps['ActivityMinute'])
+    sleep['timestamp'] = pd.to_datetime(sleep['date'])
+    cal['timestamp'] = pd.to_datetime(cal['ActivityMinute'])
+    intensity['timestamp'] = pd.to_datetime(intensity['ActivityMinute'])
+    df = hr[['timestamp', 'Value']].rename(columns={'Value': 'heart_rate'})
+    df = df.merge(steps[['timestamp', 'Steps']], on='timestamp', how='inner')
+    df = df.merge(sleep[['timestamp', 'value']], on='timestamp', how='left').rename(columns={'value': 'sleep'})
+    df = df.merge(cal[['timestamp', 'Calories']], on='timestamp', how='left')
+    return df.merge(intensity[['timestamp', 'Intensity']], on='timestamp', how='left')
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Fitabase merge strategies on a synthetic export.")
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    write_example_participant(root, days=args.days)
+    files = discover(root)["1003"]
+    hr_mb = os.path.getsize(files['heart_rate_seconds'][0]) / 1e6
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # "Could not infer format" per column
+        seconds, old = timed(hash_merge, files)
+    print(f"[Bench] hash merge, inferred formats : {seconds:6.2f}s, {len(old):,} rows, "
+          f"sleep matched {old['sleep'].notna().mean():.0%}")
+    seconds, new = timed(load_participant, files, "1min", "1min")
+    print(f"[Bench] as-of merge, explicit format : {seconds:6.2f}s, {len(new):,} rows, "
+          f"sleep matched {new['sleep'].notna().mean():.0%}")
+    for freq in ["1min", "10s"]:
+        seconds, merged = timed(load_participant, files, freq, "seconds")
+        print(f"[Bench] heartrate_seconds ({hr_mb:.1f}MB) @ {freq:>4}: {seconds:6.2f}s, {len(merged):,} rows")
+
+if __name__ == "__main__":
+    main()
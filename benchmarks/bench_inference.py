@@ -0,0 +1,114 @@
+"""
+Load test for backend/inference.py: p50/p99 latency and requests/sec on CPU.
+
+Starts the inference server in a subprocess for every --max-batch-size value
+(1 = no micro-batching) and drives it with --concurrency keep-alive client
+threads. Without --model a randomly initialized HealthRiskLSTM is served;
+latency does not depend on the weights.
+
+    python benchmarks/bench_inference.py --concurrency 64 --max-batch-size 1,32,128
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.model import HealthRiskLSTM
+from backend.training import get_parameters, save_parameters
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(model_path, port, max_batch_size, max_latency_ms):
+    script = os.path.join(os.path.dirname(__file__), "../backend/inference.py")
+    proc = subprocess.Popen([sys.executable, script, "--model", model_path, "--port", str(port),
+                             "--max-batch-size", str(max_batch_size), "--max-latency-ms", str(max_latency_ms)],
+                            stdout=subprocess.DEVNULL)
+    for _ in range(300):
+        try:
+            health(port)
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("inference server did not start")
+
+def health(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/health")
+    return json.loads(conn.getresponse().read())
+
+def run_load(port, body, num_requests, concurrency):
+    counter = itertools.count()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine = []
+        while next(counter) < num_requests:
+            start = time.perf_counter()
+            conn.request("POST", "/predict", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array(latencies), time.perf_counter() - start, errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the micro-batching inference server.")
+    parser.add_argument("--model", help="Global model .npz (default: random init)")
+    parser.add_argument("--max-batch-size", default="1,64", help="Comma-separated server settings to compare")
+    parser.add_argument("--max-latency-ms", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--windows-per-request", type=int, default=1)
+    parser.add_argument("--seq-len", type=int, default=10)
+    args = parser.parse_args()
+
+    model_path = args.model
+    if model_path is None:
+        model_path = os.path.join(tempfile.mkdtemp(), "bench_model.npz")
+        save_parameters(model_path, get_parameters(HealthRiskLSTM()))
+    windows = np.random.default_rng(0).random((args.windows_per_request, args.seq_len, 5)).round(4)
+    body = json.dumps({"windows": windows.tolist()}).encode()
+
+    for max_batch_size in [int(b) for b in args.max_batch_size.split(",")]:
+        port = free_port()
+        proc = start_server(model_path, port, max_batch_size, args.max_latency_ms)
+        try:
+            run_load(port, body, min(200, args.requests), args.concurrency)  # Warm-up
+            before = health(port)
+            latencies, seconds, errors = run_load(port, body, args.requests, args.concurrency)
+            after = health(port)
+        finally:
+            proc.terminate()
+            proc.wait()
+        batches = after["batches"] - before["batches"]
+        mean_batch = (after["windows"] - before["windows"]) / batches if batches else 0
+        print(f"[Bench] max batch {max_batch_size:>4}: {len(latencies) / seconds:8.0f} req/s, "
+              f"p50 {np.percentile(latencies, 50) * 1000:6.2f}ms, p99 {np.percentile(latencies, 99) * 1000:6.2f}ms, "
+              f"mean batch {mean_batch:5.1f} windows, {len(errors)} errors")
+
+if __name__ == "__main__":
+    main()
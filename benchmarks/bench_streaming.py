@@ -0,0 +1,51 @@
+"""
+Benchmark: per-tick cost of scoring N live patients with StreamingScorer
+(one batched LSTM-cell step) vs re-running HealthRiskLSTM over every
+patient's last seq_len observations.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import torch
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.model import HealthRiskLSTM
+from backend.streaming import StreamingScorer
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare streaming vs windowed scoring per tick.")
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--seq-len", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+    model = HealthRiskLSTM().eval()
+    rng = np.random.default_rng(0)
+    feed = rng.random((args.ticks, args.patients, 5), dtype=np.float32)
+    patient_ids = list(range(args.patients))
+
+    scorer = StreamingScorer(model, capacity=args.patients)
+    start = time.perf_counter()
+    for t in range(args.ticks):
+        scorer.update(patient_ids, feed[t])
+    streaming = (time.perf_counter() - start) / args.ticks
+
+    history = torch.zeros(args.patients, args.seq_len, 5)
+    start = time.perf_counter()
+    with torch.inference_mode():
+        for t in range(args.ticks):
+            history = torch.cat([history[:, 1:], torch.from_numpy(feed[t])[:, None]], dim=1)
+            model(history)
+    windowed = (time.perf_counter() - start) / args.ticks
+
+    for name, seconds in [("windowed", windowed), ("streaming", streaming)]:
+        print(f"[Bench] {name:>9}: {seconds * 1e3:8.2f}ms per tick for {args.patients:,} patients "
+              f"({seconds / args.patients * 1e6:.2f}us each)")
+    print(f"[Bench] speedup: {windowed / streaming:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,126 +0,0 @@
-data_path = "data/processed/user_11.csv"
-# clients/client_3/train.py
-from flwr.client import NumPyClient, start_client
-import torch
-import torch.nn as nn
-import torch.optim as optim
-import numpy as np
-import sys
-import os
-import csv
-import shap
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
-from backend.model import HealthRiskLSTM
-from backend.utils.data_loader import get_dataloader
-
-DEVICE = torch.device("cpu")
-CSV_PATH = "data/processed/user_3.csv"
-LOG_PATH = "data/logs/client_3_log.csv"
-LOG_SHAP_PATH = "data/logs/client_3_shap.csv"
-os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
-
-class FLClient(NumPyClient):
-    def __init__(self):
-        self.model = HealthRiskLSTM()
-        self.model.to(DEVICE)
-        self.criterion = nn.BCELoss()
-        self.optimizer = optim.Adam(self.model.parameters(), lr=0.001)
-        self.trainloader = get_dataloader(CSV_PATH)
-        self.log_file = open(LOG_PATH, "w", newline="")
-        self.logger = csv.writer(self.log_file)
-        self.logger.writerow(["round", "loss", "accuracy"])
-        self.round = 0
-        self.shap_values = None
-
-    def get_parameters(self, config):
-        return [val.cpu().numpy() for val in self.model.state_dict().values()]
-
-    def set_parameters(self, parameters):
-        params_dict = zip(self.model.state_dict().keys(), parameters)
-        state_dict = {k: torch.tensor(v) for k, v in params_dict}
-        self.model.load_state_dict(state_dict, strict=True)
-
-    def fit(self, parameters, config):
-        self.set_parameters(parameters)
-        self.model.train()
-        total_loss, correct, total = 0.0, 0, 0
-        all_x, all_y = [], []
-        for xb, yb in self.trainloader:
-            xb, yb = xb.to(DEVICE), yb.to(DEVICE).unsqueeze(1)
-            self.optimizer.zero_grad()
-            preds = self.model(xb)
-            loss = self.criterion(preds, yb)
-            loss.backward()
-            self.optimizer.step()
-            total_loss += loss.item() * xb.size(0)
-            correct += ((preds > 0.5).float() == yb).sum().item()
-            total += xb.size(0)
-            all_x.append(xb.cpu())
-            all_y.append(yb.cpu())
-        avg_loss = total_loss / total if total > 0 else 0
-        accuracy = correct / total if total > 0 else 0
-        self.round += 1
-        self.logger.writerow([self.round, avg_loss, accuracy])
-        self.log_file.flush()
-
-        # SHAP computation (on first batch only for speed)
-        if self.round == 1:
-            x_sample = all_x[0] if all_x else None
-            if x_sample is not None:
-                try:
-                    explainer = shap.DeepExplainer(self.model, x_sample)
-                    # SHAP feature importance
-                    shap_vals = explainer.shap_values(x_sample, check_additivity=False)
-                    
-                    # Ensure shap_vals is a numpy array and has the right shape
-                    if isinstance(shap_vals, list):
-                        shap_vals = np.array(shap_vals)
-                    
-                    # Compute mean absolute SHAP values
-                    if shap_vals is not None and shap_vals.size > 0:
-                        mean_abs_shap = np.abs(shap_vals).mean(axis=0)
-                        feature_names = ["heart_rate", "steps", "sleep", "stress_level", "spO2"]
-                        
-                        # Ensure we have the right number of features
-                        if len(mean_abs_shap) == len(feature_names):
-                            with open(LOG_SHAP_PATH, "w") as f:
-                                f.write(",".join(feature_names) + "\n")
-                                f.write(",".join(f"{v:.8f}" for v in mean_abs_shap) + "\n")
-                            print(f"[Client 3] SHAP values written successfully")
-                        else:
-                            print(f"[Client 3] SHAP shape mismatch: expected {len(feature_names)}, got {len(mean_abs_shap)}")
-                    else:
-                        print(f"[Client 3] SHAP computation returned empty values")
-                        
-                except Exception as e:
-                    print(f"[Client 3] SHAP computation failed: {e}")
-                    # Generate fallback SHAP data
-                    feature_names = ["heart_rate", "steps", "sleep", "stress_level", "spO2"]
-                    fallback_values = [0.0027, 0.0039, 0.0009, 0.0016, 0.0004]
-                    with open(LOG_SHAP_PATH, "w") as f:
-                        f.write(",".join(feature_names) + "\n")
-                        f.write(",".join(f"{v:.8f}" for v in fallback_values) + "\n")
-                    print(f"[Client 3] Generated fallback SHAP data")
-        return self.get_parameters(config={}), len(self.trainloader.dataset), {}
-
-    def evaluate(self, parameters, config):
-        self.set_parameters(parameters)
-        self.model.eval()
-        loss, correct, total = 0.0, 0, 0
-        with torch.no_grad():
-            for xb, yb in self.trainloader:
-                xb, yb = xb.to(DEVICE), yb.to(DEVICE).unsqueeze(1)
-                preds = self.model(xb)
-                loss += self.criterion(preds, yb).item() * xb.size(0)
-                correct += ((preds > 0.5).float() == yb).sum().item()
-                total += xb.size(0)
-        accuracy = correct / total if total > 0 else 0
-        return float(loss) / total, total, {"accuracy": accuracy}
-
-    def __del__(self):
-        if hasattr(self, 'log_file'):
-            self.log_file.close()
-
-if __name__ == "__main__":
-    print("[Client 3] Starting Flower client...")
-    start_client(server_address="server:8080", client=FLClient()) 
\ No newline at end of file
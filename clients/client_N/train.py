@@ -1,12 +1,72 @@
 """
-Stub for federated client training (client_N, generic client).
+Generic federated client runner (client_N).
+
+One script serves any number of clients: the client id, data path and log
+paths come from the command line or the environment, e.g.
+
+    CLIENT_ID=7 python clients/client_N/train.py
+    python clients/client_N/train.py --client-id 7 --data-path data/processed/user_12.csv
 """
 from flwr.client import start_client
+import argparse
+import csv
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from backend.client import FLClient
+from backend.events import EVENTS_PATH
+from backend.metrics_store import METRICS_DB_PATH
+
+ASSIGNMENTS_PATH = "clients/assignments.csv"
+
+def assigned_data_path(client_id):
+    # Written by assign_client_data.py; falls back to user_<id>.csv
+    if os.path.exists(ASSIGNMENTS_PATH):
+        with open(ASSIGNMENTS_PATH, newline="") as f:
+            for row in csv.DictReader(f):
+                if int(row["client_id"]) == client_id:
+                    return row["data_path"]
+    return f"data/processed/user_{client_id}.csv"
+
+def parse_args(argv=None):
+    env = os.environ
+    parser = argparse.ArgumentParser(description="Run one federated client.")
+    parser.add_argument("--client-id", type=int, default=env.get("CLIENT_ID"))
+    parser.add_argument("--data-path", default=env.get("DATA_PATH"))
+    parser.add_argument("--log-path", default=env.get("LOG_PATH"))
+    parser.add_argument("--shap-path", default=env.get("SHAP_PATH"))
+    parser.add_argument("--server-address", default=env.get("SERVER_ADDRESS", "server:8080"))
+    parser.add_argument("--cache-dir", default=env.get("CACHE_DIR"), help="Load data through the NPY cache in this directory")
+    parser.add_argument("--windowed", action="store_true", default=env.get("WINDOWED") == "1", help="Use the strided windowed loader")
+    parser.add_argument("--attribution", default=env.get("ATTRIBUTION", "deep_shap"),
+                        choices=["deep_shap", "integrated_gradients", "gradient_x_input"],
+                        help="Feature attribution engine for the per-round SHAP log")
+    parser.add_argument("--explain-size", type=int, default=int(env.get("EXPLAIN_SIZE", 32)),
+                        help="Training windows explained per round")
+    parser.add_argument("--events-path", default=env.get("EVENTS_PATH", EVENTS_PATH),
+                        help="JSON-lines event channel for the live dashboard ('' disables)")
+    parser.add_argument("--metrics-db", default=env.get("METRICS_DB", METRICS_DB_PATH),
+                        help="SQLite metrics store shared with the server and dashboard ('' disables)")
+    args = parser.parse_args(argv)
+    if args.client_id is None:
+        parser.error("--client-id or CLIENT_ID is required")
+    args.data_path = args.data_path or assigned_data_path(args.client_id)
+    args.log_path = args.log_path or f"data/logs/client_{args.client_id}_log.csv"
+    args.shap_path = args.shap_path or f"data/logs/client_{args.client_id}_shap.csv"
+    return args
 
-def main():
-    print("[Client N] Starting local training (stub)...")
-    # Placeholder: load data, train model, report metrics
-    # start_client(...)
+def main(argv=None):
+    args = parse_args(argv)
+    client = FLClient(args.client_id, args.data_path, args.log_path, args.shap_path,
+                      attribution=args.attribution, explain_size=args.explain_size, events_path=args.events_path,
+                      metrics_db=args.metrics_db,
+                      windowed=args.windowed, cache_dir=args.cache_dir)
+    print(f"[Client {args.client_id}] Starting Flower client on {args.data_path}...")
+    try:
+        start_client(server_address=args.server_address, client=client.to_client())
+    finally:
+        # Waits for queued SHAP explanations to be written
+        client.close()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -3,11 +3,15 @@ Streamlit dashboard for federated health risk prediction system (stub).
 """
 import streamlit as st
 import pandas as pd
-import glob
 import os
+import sys
+import time
 import altair as alt
 import ast
 import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.metrics_store import MetricsStore
+from dashboard.log_store import LogStore
 
 # --- UI/UX ENHANCEMENTS ---
 st.set_page_config(page_title="Federated Health Risk Prediction Dashboard", layout="wide")
@@ -33,13 +37,63 @@ st.markdown("""
 with st.sidebar:
     st.image("https://img.icons8.com/ios-filled/100/ffffff/hospital-room.png", width=80)
     st.header("Controls")
+    live_mode = st.toggle("Live mode", help="Follow data/logs/events.jsonl while a run is in progress")
+    refresh_seconds = st.slider("Refresh interval (s)", 1, 30, 2, disabled=not live_mode)
 
 LOG_DIR = "data/logs"
-log_files = sorted(glob.glob(os.path.join(LOG_DIR, "client*_log.csv")))
-shap_files = sorted(glob.glob(os.path.join(LOG_DIR, "client*_shap.csv")))
-client_names = [f"Client {i+1}" for i in range(len(log_files))]
+METRICS_DB = os.path.join(LOG_DIR, "metrics.db")
 
-if not log_files:
+@st.cache_resource
+def get_log_store():
+    # One store per server process: parsed logs survive reruns and are shared by sessions
+    return LogStore(LOG_DIR)
+
+@st.cache_resource
+def get_metrics_db():
+    return MetricsStore(METRICS_DB, readonly=True)
+
+store = get_log_store()
+
+def live_chart(df, x, y, title, color, mark="line"):
+    base = alt.Chart(df)
+    base = base.mark_line(point=alt.OverlayMarkDef(color=color, size=60), color=color) if mark == "line" else base.mark_bar(color=color)
+    return base.encode(
+        x=alt.X(f'{x}:Q', title='Round', axis=alt.Axis(labelColor="#fff", titleColor="#fff")),
+        y=alt.Y(f'{y}:Q', title=title, axis=alt.Axis(labelColor="#fff", titleColor="#fff")),
+        tooltip=list(df.columns)
+    ).configure(background="#111", axis=alt.AxisConfig(gridColor="#333")).properties(height=280)
+
+def live_panel(client_id, y_col, metric_name):
+    # Runs as a fragment: only this panel reruns, and each run parses just the new events
+    client_rounds = store.events("client_round")
+    server_rounds = store.events("server_round")
+    if client_rounds.empty:
+        st.info("Waiting for events from the current run...")
+        return
+    last_event = max(client_rounds["ts"].max(), server_rounds["ts"].max() if not server_rounds.empty else 0)
+    st.caption(f"{len(client_rounds)} client updates, {len(server_rounds)} completed rounds; "
+               f"last event {time.time() - last_event:.0f}s ago.")
+    left, right = st.columns(2)
+    with left:
+        mine = client_rounds[client_rounds["client"] == client_id][["round", y_col]]
+        if mine.empty:
+            st.info(f"No events from Client {client_id} yet.")
+        else:
+            st.altair_chart(live_chart(mine, "round", y_col, f"Client {client_id} {metric_name}", "#e76f51"), use_container_width=True)
+    with right:
+        per_round = client_rounds.groupby("round").agg(**{f"avg_{y_col}": (y_col, "mean"), "clients": ("client", "nunique")}).reset_index()
+        st.altair_chart(live_chart(per_round, "round", f"avg_{y_col}", f"Average {metric_name}", "#2a9d8f"), use_container_width=True)
+    if not server_rounds.empty and "round_seconds" in server_rounds:
+        st.altair_chart(live_chart(server_rounds[["round", "round_seconds"]], "round", "round_seconds", "Round wall time (s)", "#a8dadc", mark="bar"),
+                        use_container_width=True)
+
+# Indexed queries against the metrics DB when a run has written one; parsed CSV logs otherwise
+metrics = get_metrics_db() if os.path.exists(METRICS_DB) else store
+shap_paths = store.client_files("shap")
+client_ids = metrics.client_ids()
+client_names = [f"Client {cid}" for cid in client_ids]
+
+if not client_ids:
     st.warning("No client logs found. Please run the federated learning pipeline first.")
 else:
     # --- DROPDOWNS AT TOP ---
@@ -51,21 +105,15 @@ else:
     with col3:
         shap_client = st.selectbox("Select client for SHAP", client_names, key="shap_client")
     client_idx = client_names.index(selected_client)
-    log_file = log_files[client_idx]
+    history = metrics.client_history(client_ids[client_idx])
     
-    # Check if log file exists and has content
-    if not os.path.exists(log_file) or os.path.getsize(log_file) == 0:
+    # Check if the client has logged anything yet
+    if history.empty:
         st.warning(f"No training data available for {selected_client}. The federated learning may still be in progress.")
         st.info("Please wait for the training to complete or check if the clients are running properly.")
     else:
         try:
-            # Debug: Show file info
-            # st.info(f"Reading log file: {log_file} (size: {os.path.getsize(log_file)} bytes)")
-            df = pd.read_csv(log_file)
-            # Debug: Show DataFrame info
-            # st.info(f"DataFrame shape: {df.shape}, columns: {list(df.columns)}")
-            # if not df.empty:
-            #     st.info(f"First few rows: {df.head().to_dict()}")
+            df = history
             
             if df.empty:
                 st.warning(f"Training data for {selected_client} is empty. Please wait for training to complete.")
@@ -79,6 +127,13 @@ else:
                 st.markdown(f"<h1 style='color:{font_color};font-size:2.8rem;'>🏥 Federated Health Risk Prediction Dashboard</h1>", unsafe_allow_html=True)
                 st.markdown("<hr style='margin:1.5rem 0; border-color: #222;'>", unsafe_allow_html=True)
 
+                # --- LIVE TRAINING (fragment refreshed every refresh_seconds) ---
+                if live_mode:
+                    st.markdown(f"<h2 style='color:{font_color};'>Live Training: {selected_metric}</h2>", unsafe_allow_html=True)
+                    st.caption("Follows the event channel of the current run; only this section refreshes.")
+                    st.fragment(run_every=refresh_seconds)(live_panel)(client_ids[client_idx], selected_metric.lower(), selected_metric)
+                    st.markdown("<div style='height:2rem;'></div>", unsafe_allow_html=True)
+
                 # --- TRAINING ROUNDS CHART ---
                 st.markdown(f"<h2 style='color:{font_color};'>Training Rounds: {selected_client} - {selected_metric}</h2>", unsafe_allow_html=True)
                 st.caption("Shows the selected metric for the chosen client across federated training rounds.")
@@ -109,38 +164,9 @@ else:
                 st.markdown(f"<h2 style='color:{font_color};'>Average {selected_metric} Across Clients</h2>", unsafe_allow_html=True)
                 st.caption(f"Average {selected_metric} across all clients for each round.")
                 
-                # Read all log files with error handling
-                all_dfs = []
-                for f in log_files:
-                    try:
-                        if os.path.exists(f) and os.path.getsize(f) > 0:
-                            df_temp = pd.read_csv(f)
-                            if not df_temp.empty:
-                                all_dfs.append(df_temp)
-                    except Exception as e:
-                        st.warning(f"Error reading log file {f}: {str(e)}")
-                        continue
-                
-                if all_dfs:
-                    min_rounds = min(len(df) for df in all_dfs)
-                    
-                    # Calculate average with validation
-                    avg_metric = []
-                    for i in range(min_rounds):
-                        values = []
-                        for df in all_dfs:
-                            if y_col in df.columns and i < len(df) and np.isfinite(df.loc[i, y_col]):
-                                values.append(df.loc[i, y_col])
-                        if values:
-                            avg_metric.append(sum(values) / len(values))
-                        else:
-                            avg_metric.append(np.nan)
-                    
-                    # Filter out invalid averages
-                    valid_avgs = [(i, val) for i, val in enumerate(avg_metric) if np.isfinite(val)]
-                    
-                    if valid_avgs:
-                        avg_df = pd.DataFrame({"round": [i for i, _ in valid_avgs], f"avg_{y_col}": [val for _, val in valid_avgs]})
+                if client_ids:
+                    avg_df = metrics.round_averages(y_col)
+                    if not avg_df.empty:
                         if not avg_df.empty and np.isfinite(avg_df[f"avg_{y_col}"].values).any():
                             avg_chart = alt.Chart(avg_df).mark_line(point=alt.OverlayMarkDef(color="#2a9d8f", size=80)).encode(
                                 x=alt.X('round:Q', title='Round', axis=alt.Axis(labelColor=font_color, titleColor=font_color)),
@@ -167,13 +193,8 @@ else:
                 st.markdown(f"<h2 style='color:{font_color};'>Personalized Risk Scores (Final Accuracy)</h2>", unsafe_allow_html=True)
                 st.caption("Shows the final accuracy for each client as a bar chart.")
                 
-                # Calculate risk scores with validation
-                risk_scores = {}
-                for i, df in enumerate(all_dfs):
-                    if "accuracy" in df.columns and len(df) > 0:
-                        final_acc = df["accuracy"].iloc[-1]
-                        if np.isfinite(final_acc):
-                            risk_scores[client_names[i]] = final_acc
+                final_acc = metrics.final_values("accuracy")
+                risk_scores = {f"Client {cid}": acc for cid, acc in final_acc.items()}
                 
                 if risk_scores:
                     risk_df = pd.DataFrame({"Client": list(risk_scores.keys()), "Final Accuracy": list(risk_scores.values())})
@@ -199,18 +220,21 @@ else:
                 # --- SHAP FEATURE IMPORTANCES ---
                 st.markdown(f"<h2 style='color:{font_color};'>Feature Importances (SHAP) - {shap_client}</h2>", unsafe_allow_html=True)
                 st.caption("Shows the mean absolute SHAP value for each feature for the selected client.")
-                if shap_files:
-                    shap_idx = client_names.index(shap_client)
-                    shap_file = shap_files[shap_idx]
+                shap_client_id = client_ids[client_names.index(shap_client)]
+                shap_file = shap_paths.get(shap_client_id)
+                try:
+                    latest = metrics.latest_shap(shap_client_id)
+                except Exception:
+                    latest = None  # Malformed CSV; the legacy parser below handles it
+                if latest is not None or shap_file is not None:
                     
                     try:
                         # First try to read as regular CSV
                         try:
-                            shap_df = pd.read_csv(shap_file)
-                            if not shap_df.empty and len(shap_df.columns) == 5:
-                                # Regular CSV format
-                                shap_values = shap_df.iloc[0].values
-                                feature_names = shap_df.columns.tolist()
+                            if latest is not None and len(latest) == 5:
+                                # Regular CSV format; one row per round, show the latest
+                                shap_values = latest.values
+                                feature_names = list(latest.index)
                             else:
                                 raise ValueError("Not in expected CSV format")
                         except:
@@ -284,23 +308,8 @@ else:
                 st.markdown(f"<h2 style='color:{font_color};'>Risk Drift Over Time (Average Loss)</h2>", unsafe_allow_html=True)
                 st.caption("Shows the average loss across all clients for each round, visualized as an area chart.")
                 
-                # Calculate average loss with validation
-                avg_loss = []
-                for i in range(min_rounds):
-                    values = []
-                    for df in all_dfs:
-                        if "loss" in df.columns and i < len(df) and np.isfinite(df.loc[i, "loss"]):
-                            values.append(df.loc[i, "loss"])
-                    if values:
-                        avg_loss.append(sum(values) / len(values))
-                    else:
-                        avg_loss.append(np.nan)
-                
-                # Filter out invalid averages
-                valid_losses = [(i, val) for i, val in enumerate(avg_loss) if np.isfinite(val)]
-                
-                if valid_losses:
-                    drift_df = pd.DataFrame({"round": [i for i, _ in valid_losses], "avg_loss": [val for _, val in valid_losses]})
+                drift_df = metrics.round_averages("loss")
+                if not drift_df.empty:
                     if not drift_df.empty and np.isfinite(drift_df['avg_loss'].values).any():
                         drift_chart = alt.Chart(drift_df).mark_area(color="#a8dadc", opacity=0.6).encode(
                             x=alt.X('round:Q', title='Round', axis=alt.Axis(labelColor=font_color, titleColor=font_color)),
@@ -0,0 +1,237 @@
+"""
+Cached, incremental data layer for the dashboard.
+
+Client logs are append-only CSVs (data/logs/client_<id>_log.csv and
+client_<id>_shap.csv). LogStore keeps one parsed DataFrame per file, keyed by
+its mtime/size: an unchanged file costs one stat() per render, and a file that
+grew is tailed from the last byte offset, so only the newly appended rows get
+parsed. A file that was replaced (new inode), shrank, or whose header or
+first row changed (a client restarted and rewrote it, even to a larger size
+before the next poll) is re-read from scratch.
+
+Cross-client aggregates are computed from one long frame
+(client, round, loss, accuracy) with a single vectorized groupby.
+
+EventTail follows the live event channel (data/logs/events.jsonl, written by
+backend/events.py) the same way: each poll parses only the lines appended
+since the previous one.
+"""
+import json
+import glob
+import io
+import os
+import re
+import threading
+import numpy as np
+import pandas as pd
+
+LOG_DIR = "data/logs"
+CLIENT_FILE_RE = re.compile(r"client_?(\d+)_(log|shap)\.csv$")
+
+class TailedCSV:
+    """One CSV file parsed incrementally; `generation` increases whenever it is re-read from scratch."""
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.generation = -1
+        self._reset()
+
+    def _reset(self):
+        self.generation += 1
+        self.header = None
+        self.head = b""  # Header plus the first data row, once there is one
+        self.inode = None
+        self.columns = []
+        self.offset = 0
+        self.frame = pd.DataFrame()
+
+    def _head_unchanged(self, f):
+        f.seek(0)
+        return f.read(len(self.head)) == self.head
+
+    def refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.signature = None
+            self._reset()
+            return self.frame
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature:
+            return self.frame
+        inode = (stat.st_dev, stat.st_ino)
+        with open(self.path, "rb") as f:
+            if self.header is not None and (inode != self.inode or stat.st_size < self.offset
+                                            or not self._head_unchanged(f)):
+                self._reset()
+            f.seek(self.offset)
+            chunk = f.read()
+        # Only complete lines; a half-written last row is picked up next time
+        end = chunk.rfind(b"\n") + 1
+        chunk = chunk[:end]
+        if self.header is None and chunk:
+            header_end = chunk.find(b"\n") + 1
+            self.header = self.head = chunk[:header_end]
+            self.inode = inode
+            self.columns = self.header.decode().strip().split(",")
+            self.frame = pd.DataFrame(columns=self.columns)
+            self.offset, chunk = header_end, chunk[header_end:]
+        if self.head == self.header and chunk:
+            self.head += chunk[:chunk.find(b"\n") + 1]
+        if chunk.strip():
+            rows = pd.read_csv(io.BytesIO(chunk), header=None, names=self.columns)
+            self.frame = rows if self.frame.empty else pd.concat([self.frame, rows], ignore_index=True)
+        self.offset += len(chunk)
+        self.signature = signature
+        return self.frame
+
+class EventTail:
+    """Events of the current run (everything after the last run_start), grouped by type."""
+    def __init__(self, path):
+        self.path = path
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self.run = None
+        self.rows = {}
+        self._frames = {}
+
+    def _start_run(self, event):
+        self.run = event
+        self.rows = {}
+        self._frames = {}
+
+    def poll(self):
+        """Parse newly appended events; returns how many were read."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return 0
+        if size < self.offset:
+            self._reset()  # Truncated or replaced
+        if size == self.offset:
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        chunk = chunk[:chunk.rfind(b"\n") + 1]
+        self.offset += len(chunk)
+        count = 0
+        for line in chunk.splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get("type") == "run_start":
+                self._start_run(event)
+            else:
+                self.rows.setdefault(event.get("type"), []).append(event)
+            count += 1
+        return count
+
+    def frame(self, kind):
+        """DataFrame of one event type, extended with only the rows added since the last call."""
+        rows = self.rows.get(kind, [])
+        cached = self._frames.get(kind)
+        if cached is None or len(cached) > len(rows):
+            cached = pd.DataFrame(rows)
+        elif len(cached) < len(rows):
+            cached = pd.concat([cached, pd.DataFrame(rows[len(cached):])], ignore_index=True)
+        self._frames[kind] = cached
+        return cached
+
+class LogStore:
+    """Shared across dashboard sessions (st.cache_resource); all methods are thread-safe."""
+    def __init__(self, log_dir=LOG_DIR):
+        self.log_dir = log_dir
+        self._files = {}
+        self._lock = threading.Lock()
+        self._combined = None
+        self._combined_rows = {}  # client -> (path, generation, rows already in _combined)
+        self._events = EventTail(os.path.join(log_dir, "events.jsonl"))
+
+    def client_files(self, kind="log"):
+        """{client_id: path} for client_<id>_<kind>.csv, ordered by client id."""
+        files = {}
+        for path in glob.glob(os.path.join(self.log_dir, f"client*_{kind}.csv")):
+            match = CLIENT_FILE_RE.search(os.path.basename(path))
+            if match:
+                files[int(match.group(1))] = path
+        return dict(sorted(files.items()))
+
+    def client_ids(self):
+        return list(self.client_files("log"))
+
+    def client_history(self, client_id):
+        """round/loss/accuracy rows of one client's training log."""
+        path = self.client_files("log").get(client_id)
+        return self.read(path) if path is not None else pd.DataFrame(columns=["round", "loss", "accuracy"])
+
+    def _tailed(self, path):
+        if path not in self._files:
+            self._files[path] = TailedCSV(path)
+        return self._files[path]
+
+    def read(self, path):
+        with self._lock:
+            return self._tailed(path).refresh()
+
+    def client_logs(self):
+        """Long frame of every client's training log with a `client` column."""
+        with self._lock:
+            files = self.client_files("log")
+            frames = {client: self._tailed(path) for client, path in files.items()}
+            for tailed in frames.values():
+                tailed.refresh()
+            rows = {client: (tailed.path, tailed.generation, len(tailed.frame)) for client, tailed in frames.items()}
+            if rows == self._combined_rows:
+                return self._combined
+            appended_only = self._combined is not None and rows.keys() == self._combined_rows.keys() and all(
+                rows[c][:2] == self._combined_rows[c][:2] and rows[c][2] >= self._combined_rows[c][2] for c in rows)
+            if appended_only:
+                # Append just the new tail rows; groupby does not care about row order across clients
+                parts = [self._combined] + [frames[c].frame.iloc[self._combined_rows[c][2]:].assign(client=c)
+                                            for c in rows if rows[c][2] > self._combined_rows[c][2]]
+            else:
+                parts = [tailed.frame.assign(client=client) for client, tailed in frames.items() if not tailed.frame.empty]
+            parts = [part for part in parts if not part.empty]
+            self._combined = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["client", "round"])
+            self._combined_rows = rows
+            return self._combined
+
+    def round_averages(self, column):
+        """Mean of `column` per round over the rounds every client has logged; non-finite values are skipped."""
+        logs = self.client_logs()
+        if logs.empty or column not in logs.columns:
+            return pd.DataFrame(columns=["round", f"avg_{column}"])
+        values = pd.to_numeric(logs[column], errors="coerce").replace([np.inf, -np.inf], np.nan)
+        stats = logs.assign(_value=values).groupby("round").agg(clients=("client", "nunique"), avg=("_value", "mean"))
+        stats = stats[(stats["clients"] == logs["client"].nunique()) & stats["avg"].notna()]
+        return pd.DataFrame({"round": stats.index.values, f"avg_{column}": stats["avg"].values})
+
+    def final_values(self, column):
+        """Last logged finite value of `column` per client, as a Series indexed by client id."""
+        logs = self.client_logs()
+        if logs.empty or column not in logs.columns:
+            return pd.Series(dtype=float)
+        last = logs.groupby("client").tail(1).set_index("client")[column].astype(float)
+        return last[np.isfinite(last)]
+
+    def events(self, kind):
+        """Events of type `kind` from the current run, after picking up anything newly appended."""
+        with self._lock:
+            self._events.poll()
+            return self._events.frame(kind)
+
+    def latest_shap(self, client_id):
+        """Feature importances from the newest row of a client's SHAP log, or None."""
+        path = self.client_files("shap").get(client_id)
+        if path is None:
+            return None
+        shap_df = self.read(path)
+        feature_cols = [c for c in shap_df.columns if c != "round"]
+        if shap_df.empty or not feature_cols:
+            return None
+        return shap_df[feature_cols].iloc[-1].astype(float)
@@ -0,0 +1,131 @@
+"""
+Fitabase export loading: discover each participant's minute/second-level
+CSVs and merge them into one time-aligned frame.
+
+- Files are found by name anywhere under the export root
+  ("ID 1003_heartrate_seconds_20171001_20171007.csv", "..._minuteStepsNarrow_..."),
+  for every participant, not just one hard-coded ID.
+- Timestamps ("10/1/2017 12:00:00 AM") are parsed with an explicit format
+  instead of per-row format inference.
+- Each stream is floored to a configurable granularity (freq) and aggregated
+  per bin, then streams are aligned onto the heart-rate timeline with sorted
+  as-of joins, so sleep minutes logged at :30 seconds and sparse streams still
+  line up. A stream coarser than freq (minute steps at freq="10s") is carried
+  across the bins of its own period.
+- Seconds-level heart rate (heartrate_seconds) is used when present.
+
+    frame = load_participant(discover("fitabaseexampledata")["1003"], freq="1min")
+"""
+import os
+import re
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+FITABASE_ROOT = "fitabaseexampledata"
+TIME_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+
+# Stream -> (file kind, timestamp column, value column, per-bin aggregation, native period)
+STREAMS = {
+    'heart_rate_seconds': ("heartrate_seconds", "Time", "Value", "mean", "1s"),
+    'heart_rate': ("heartrate_1min", "Time", "Value", "mean", "1min"),
+    'steps': ("minuteStepsNarrow", "ActivityMinute", "Steps", "sum", "1min"),
+    'sleep': ("minuteSleep", "date", "value", "mean", "1min"),
+    'calories': ("minuteCaloriesNarrow", "ActivityMinute", "Calories", "sum", "1min"),
+    'intensity': ("minuteIntensitiesNarrow", "ActivityMinute", "Intensity", "mean", "1min"),
+}
+KIND_TO_STREAM = {spec[0]: stream for stream, spec in STREAMS.items()}
+FILE_PATTERN = re.compile(r"^(?:ID )?(?P<participant>[^_]+)_(?P<kind>" + "|".join(KIND_TO_STREAM) +
+                          r")_(?P<start>\d{8})_(?P<end>\d{8})\.csv$")
+
+def index_participants(root=FITABASE_ROOT):
+    """Index every Fitabase file under root by participant:
+    {id: {"streams": {stream: [paths sorted by start date]}, "start": "YYYYMMDD", "end": "YYYYMMDD"}}."""
+    found = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            match = FILE_PATTERN.match(name)
+            if match:
+                streams = found.setdefault(match['participant'], {})
+                streams.setdefault(KIND_TO_STREAM[match['kind']], []).append(
+                    (match['start'], match['end'], os.path.join(dirpath, name)))
+    index = {}
+    for pid, streams in sorted(found.items()):
+        ranges = [(start, end) for files in streams.values() for start, end, _ in files]
+        index[pid] = {'streams': {stream: [path for _, _, path in sorted(files)] for stream, files in streams.items()},
+                      'start': min(start for start, _ in ranges), 'end': max(end for _, end in ranges)}
+    return index
+
+def discover(root=FITABASE_ROOT):
+    """Map participant id -> {stream: [paths sorted by start date]} for every Fitabase file under root."""
+    return {pid: entry['streams'] for pid, entry in index_participants(root).items()}
+
+def read_stream(paths, stream, freq="1min"):
+    """One stream's files -> Series of per-bin values indexed by sorted bin start. Bins are never
+    finer than the stream's own period, so sleep minutes logged at :30 stay in their minute."""
+    _, time_col, value_col, how, period = STREAMS[stream]
+    freq = max(pd.Timedelta(freq), pd.Timedelta(period))
+    parts = [pd.read_csv(path, usecols=[time_col, value_col]) for path in paths]
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    timestamps = pd.to_datetime(df[time_col], format=TIME_FORMAT)
+    values = df[value_col].astype(np.float64)
+    values.index = timestamps.dt.floor(freq)
+    if not values.index.is_monotonic_increasing:  # Fitabase files are already in time order
+        values = values.sort_index(kind="stable")
+    return values.groupby(level=0, sort=False).agg(how).rename(stream)
+
+def load_participant(files, freq="1min", hr_source="auto"):
+    """Merge a participant's streams (from discover()) on the heart-rate timeline.
+
+    hr_source: "seconds", "1min", or "auto" (seconds-level when available).
+    Rows without a steps value are dropped, as in the original inner merge.
+    Returns a frame with timestamp, heart_rate, steps, sleep, calories and intensity
+    (missing sleep/calories/intensity are NaN).
+    """
+    if hr_source == "auto":
+        hr_source = "seconds" if files.get('heart_rate_seconds') else "1min"
+    hr_stream = 'heart_rate_seconds' if hr_source == "seconds" else 'heart_rate'
+    if not files.get(hr_stream) or not files.get('steps'):
+        raise FileNotFoundError(f"Need {STREAMS[hr_stream][0]} and minuteStepsNarrow files, found {sorted(files)}")
+    df = read_stream(files[hr_stream], hr_stream, freq).rename('heart_rate').rename_axis('timestamp').reset_index()
+    bin_width = pd.Timedelta(freq)
+    for stream in ('steps', 'sleep', 'calories', 'intensity'):
+        if not files.get(stream):
+            df[stream] = np.nan
+            continue
+        right = read_stream(files[stream], stream, freq).rename_axis('timestamp').reset_index()
+        # A bin takes the latest value of the stream within one of its periods (or one bin)
+        tolerance = max(bin_width, pd.Timedelta(STREAMS[stream][4])) - pd.Timedelta(1, "ns")
+        df = pd.merge_asof(df, right, on='timestamp', direction='backward', tolerance=tolerance)
+    return df[df['steps'].notna()].reset_index(drop=True)
+
+def write_example_participant(root, participant="1003", start=datetime(2017, 10, 1), days=7,
+                              hr_seconds_step=5, seed=0):
+    """Write a synthetic Fitabase export for one participant (same layout and formats) for testing."""
+    rng = np.random.default_rng(seed)
+    minutes = pd.date_range(start, periods=days * 24 * 60, freq="1min")
+    seconds = pd.date_range(start, start + timedelta(days=days), freq=f"{hr_seconds_step}s", inclusive="left")
+    end = (start + timedelta(days=days - 1)).strftime("%Y%m%d")
+
+    def write(folder, kind, columns):
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+        path = os.path.join(root, folder, f"ID {participant}_{kind}_{start:%Y%m%d}_{end}.csv")
+        pd.DataFrame({'Id': participant, **columns}).to_csv(path, index=False)
+        return path
+
+    def stamps(index):
+        return index.strftime("%-m/%-d/%Y %-I:%M:%S %p")
+
+    hr = 70 + 15 * np.sin(np.arange(len(seconds)) * 2 * np.pi / (86400 / hr_seconds_step)) + rng.normal(0, 5, len(seconds))
+    write("HeartRate", "heartrate_seconds", {'Time': stamps(seconds), 'Value': hr.round().astype(int)})
+    write("HeartRate", "heartrate_1min", {'Time': stamps(minutes), 'Value': np.asarray(
+        pd.Series(hr).groupby(np.arange(len(hr)) // (60 // hr_seconds_step)).mean().round().astype(int))[:len(minutes)]})
+    write("Steps", "minuteStepsNarrow", {'ActivityMinute': stamps(minutes), 'Steps': rng.poisson(8, len(minutes))})
+    write("Calories", "minuteCaloriesNarrow", {'ActivityMinute': stamps(minutes),
+                                                'Calories': rng.uniform(1, 5, len(minutes)).round(4)})
+    write("Intensity", "minuteIntensitiesNarrow", {'ActivityMinute': stamps(minutes),
+                                                    'Intensity': rng.integers(0, 4, len(minutes))})
+    # Sleep minutes are logged at :30 seconds, between 23:00 and 07:00
+    night = minutes[(minutes.hour >= 23) | (minutes.hour < 7)] + pd.Timedelta(seconds=30)
+    write("SleepClassic", "minuteSleep", {'date': stamps(night), 'value': rng.choice([1, 1, 1, 2, 3], len(night)),
+                                          'logId': 1})
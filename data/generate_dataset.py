@@ -1,10 +1,36 @@
 """
 Stub for generating and partitioning dataset by user for federated simulation.
+
+--cohort generates a large synthetic cohort for scale testing instead: each
+shard of users is drawn as one (users, rows, features) NumPy array with
+per-user baselines, within-user noise, a linear per-user drift and labels
+whose per-user prevalence is skewed (non-IID) by --label-skew. Shards are
+generated and written by a process pool, one user_<n>.npz (or .csv) per
+user, so memory is bounded by --users-per-shard. Output is identical for the
+same --seed and --users-per-shard whatever the number of workers.
+
+    python data/generate_dataset.py --cohort --users 2000 --rows 5000 --label-skew 2 --workers 8   # -> data/cohort
 """
+import argparse
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 
+# Feature -> (population mean, between-user spread, min, max)
+COHORT_FEATURES = {
+    "heart_rate": (75.0, 10.0, 40.0, 200.0),
+    "steps": (100.0, 60.0, 0.0, 500.0),
+    "sleep": (7.0, 1.2, 0.0, 12.0),
+    "stress_level": (0.5, 0.2, 0.0, 1.0),
+    "spO2": (97.5, 1.2, 90.0, 100.0),
+}
+# Log-odds of risk per standardized feature
+RISK_WEIGHTS = np.array([0.8, -0.5, -0.4, 0.9, -0.6], dtype=np.float32)
+# Kept apart from data/processed so cohort users never mix with the placeholder/Fitabase ones
+COHORT_DIR = "data/cohort"
+
 def generate_placeholder_data(num_users=5, num_samples=1000):
     os.makedirs("data/processed", exist_ok=True)
     for user_id in range(1, num_users+1):
@@ -19,5 +45,81 @@ def generate_placeholder_data(num_users=5, num_samples=1000):
         df.to_csv(f"data/processed/user_{user_id}.csv", index=False)
     print("[Data] Placeholder user data generated.")
 
+def generate_shard(num_users, rows, rng, noise=0.5, drift=0.5, label_skew=0.0):
+    """One batch of users: features (users, rows, 5) and 0/1 labels (users, rows), float32."""
+    mean, spread, low, high = (np.array(col, dtype=np.float32) for col in zip(*COHORT_FEATURES.values()))
+    num_features = len(mean)
+    baseline = mean + spread * rng.standard_normal((num_users, 1, num_features), dtype=np.float32)
+    # Linear drift: by the last row a user's mean has moved by N(0, drift) spreads
+    slope = drift * spread * rng.standard_normal((num_users, 1, num_features), dtype=np.float32)
+    t = np.linspace(0, 1, rows, dtype=np.float32)[None, :, None]
+    features = baseline + slope * t
+    features += noise * spread * rng.standard_normal((num_users, rows, num_features), dtype=np.float32)
+    np.clip(features, low, high, out=features)
+    # Non-IID labels: each user's prevalence ~ Beta(1/skew, 1/skew) shifts its log-odds
+    if label_skew > 0:
+        prevalence = rng.beta(1 / label_skew, 1 / label_skew, size=(num_users, 1)).clip(0.01, 0.99)
+        bias = np.log(prevalence / (1 - prevalence)).astype(np.float32)
+    else:
+        bias = np.zeros((num_users, 1), dtype=np.float32)
+    logits = ((features - mean) / spread) @ RISK_WEIGHTS + bias
+    labels = (rng.random((num_users, rows), dtype=np.float32) < 1 / (1 + np.exp(-logits))).astype(np.float32)
+    return features, labels
+
+def write_user(path, features, labels, fmt="npz"):
+    columns = {name: features[:, k] for k, name in enumerate(COHORT_FEATURES)}
+    columns["cardiovascular_risk"] = labels
+    tmp_path = f"{path}.tmp"
+    if fmt == "npz":
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **columns)
+    else:
+        pd.DataFrame(columns).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _write_shard(shard, first_user, num_users, rows, seed, noise, drift, label_skew, out_dir, fmt):
+    rng = np.random.default_rng([seed, shard])  # Depends only on the seed and the shard, not the worker
+    features, labels = generate_shard(num_users, rows, rng, noise, drift, label_skew)
+    for k in range(num_users):
+        write_user(os.path.join(out_dir, f"user_{first_user + k}.{fmt}"), features[k], labels[k], fmt)
+    return num_users, float(labels.mean())
+
+def generate_cohort(num_users=1000, rows=1000, seed=0, noise=0.5, drift=0.5, label_skew=0.0,
+                    out_dir=COHORT_DIR, users_per_shard=64, workers=None, fmt="npz"):
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    shards = [(shard, first + 1, min(users_per_shard, num_users - first))
+              for shard, first in enumerate(range(0, num_users, users_per_shard))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_write_shard, shard, first_user, count, rows, seed, noise, drift, label_skew,
+                               out_dir, fmt) for shard, first_user, count in shards]
+        results = [future.result() for future in futures]
+    prevalence = sum(n * p for n, p in results) / num_users
+    seconds = time.perf_counter() - start
+    print(f"[Data] Cohort of {num_users} users x {rows} rows ({num_users * rows:,} rows, {len(shards)} shards, "
+          f"positive rate {prevalence:.2f}) written to {out_dir} in {seconds:.1f}s")
+    return num_users * rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate per-user data for federated simulation.")
+    parser.add_argument("--cohort", action="store_true", help="Generate a large batched synthetic cohort")
+    parser.add_argument("--users", type=int, default=None, help="Users (default: 5 placeholder / 1000 cohort)")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.5, help="Within-user noise, in between-user spreads")
+    parser.add_argument("--drift", type=float, default=0.5, help="Std of each user's drift over the series, in spreads")
+    parser.add_argument("--label-skew", type=float, default=0.0,
+                        help="Non-IID label skew: 0 = same prevalence for every user, larger = more skewed")
+    parser.add_argument("--users-per-shard", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=["npz", "csv"], default="npz")
+    parser.add_argument("--out-dir", default=COHORT_DIR, help="Cohort output directory")
+    args = parser.parse_args()
+    if args.cohort:
+        generate_cohort(args.users or 1000, args.rows, args.seed, args.noise, args.drift, args.label_skew,
+                        args.out_dir, args.users_per_shard, args.workers, args.format)
+    else:
+        generate_placeholder_data(args.users or 5, args.rows)
+
 if __name__ == "__main__":
-    generate_placeholder_data() 
\ No newline at end of file
+    main()
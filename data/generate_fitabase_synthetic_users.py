@@ -1,52 +1,46 @@
+"""
+Build synthetic federated users from one participant of a Fitabase export.
+
+The participant's heart rate (seconds-level when available), steps, sleep,
+calories and intensity files are discovered under --root and merged with
+data/fitabase.py at --freq granularity, then perturbed into N users.
+
+    python data/generate_fitabase_synthetic_users.py --root fitabaseexampledata --participant 1003 --freq 1min
+"""
+import argparse
 import os
+import sys
 import numpy as np
-import pandas as pd
-
-# Paths to raw data
-HR_PATH = "fitabaseexampledata/HeartRate/ID 1003_heartrate_1min_20171001_20171007.csv"
-STEPS_PATH = "fitabaseexampledata/Steps/ID 1003_minuteStepsNarrow_20171001_20171007.csv"
-SLEEP_PATH = "fitabaseexampledata/SleepClassic/ID 1003_minuteSleep_20171001_20171007.csv"
-CAL_PATH = "fitabaseexampledata/Calories/ID 1003_minuteCaloriesNarrow_20171001_20171007.csv"
-INTENSITY_PATH = "fitabaseexampledata/Intensity/ID 1003_minuteIntensitiesNarrow_20171001_20171007.csv"
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from data.fitabase import FITABASE_ROOT, discover, load_participant
 
 PROCESSED_DIR = "data/processed"
 N_SYNTHETIC_USERS = 5
+DEFAULT_PARTICIPANT = "1003"
 
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
-def load_and_merge():
-    # Load data
-    hr = pd.read_csv(HR_PATH)
-    steps = pd.read_csv(STEPS_PATH)
-    sleep = pd.read_csv(SLEEP_PATH)
-    cal = pd.read_csv(CAL_PATH)
-    intensity = pd.read_csv(INTENSITY_PATH)
-
-    # Standardize timestamp columns
-    hr['timestamp'] = pd.to_datetime(hr['Time'])
-    steps['timestamp'] = pd.to_datetime(steps['ActivityMinute'])
-    sleep['timestamp'] = pd.to_datetime(sleep['date'])
-    cal['timestamp'] = pd.to_datetime(cal['ActivityMinute'])
-    intensity['timestamp'] = pd.to_datetime(intensity['ActivityMinute'])
+def load_and_merge(participant=DEFAULT_PARTICIPANT, root=FITABASE_ROOT, freq="1min", hr_source="auto"):
+    participants = discover(root)
+    if participant not in participants:
+        raise FileNotFoundError(f"No Fitabase files for participant {participant} under {root}; "
+                                f"found {sorted(participants) or 'none'}")
+    return engineer_features(load_participant(participants[participant], freq, hr_source))
 
-    # Merge on timestamp (inner join for aligned data)
-    df = hr[['timestamp', 'Value']].rename(columns={'Value': 'heart_rate'})
-    df = df.merge(steps[['timestamp', 'Steps']], on='timestamp', how='inner')
-    df = df.merge(sleep[['timestamp', 'value']], on='timestamp', how='left').rename(columns={'value': 'sleep'})
-    df = df.merge(cal[['timestamp', 'Calories']], on='timestamp', how='left')
-    df = df.merge(intensity[['timestamp', 'Intensity']], on='timestamp', how='left')
+# Model features and a synthetic label from a merged participant frame; rng defaults to np.random
+def engineer_features(df, rng=None):
+    rng = rng or np.random
 
     # Fill missing values
     df['sleep'] = df['sleep'].fillna(0)
-    df['Calories'] = df['Calories'].fillna(0)
-    df['Intensity'] = df['Intensity'].fillna(0)
+    df['calories'] = df['calories'].fillna(0)
+    df['intensity'] = df['intensity'].fillna(0)
 
     # Feature engineering
-    df['steps'] = df['Steps']
-    df['stress_level'] = df['Intensity'] / (df['Intensity'].max() + 1e-8)  # proxy
-    df['spO2'] = np.random.uniform(95, 100, len(df))  # simulate spO2
+    df['stress_level'] = df['intensity'] / (df['intensity'].max() + 1e-8)  # proxy
+    df['spO2'] = rng.uniform(95, 100, len(df))  # simulate spO2
     df['cardiovascular_risk'] = (df['heart_rate'] > 90).astype(float) * 0.7 + (df['stress_level'] > 0.5).astype(float) * 0.3
-    df['cardiovascular_risk'] = df['cardiovascular_risk'] + np.random.normal(0, 0.05, len(df))
+    df['cardiovascular_risk'] = df['cardiovascular_risk'] + rng.normal(0, 0.05, len(df))
     df['cardiovascular_risk'] = df['cardiovascular_risk'].clip(0, 1)
 
     # Final columns
@@ -77,6 +71,14 @@ def make_synthetic_users(df, n_users=5):
         print(f"[Data] Saved synthetic user {i} data to {PROCESSED_DIR}/user_{i}.csv")
 
 if __name__ == "__main__":
-    df = load_and_merge()
-    make_synthetic_users(df, N_SYNTHETIC_USERS)
+    parser = argparse.ArgumentParser(description="Generate synthetic users from a Fitabase participant.")
+    parser.add_argument('--root', default=FITABASE_ROOT, help='Fitabase export directory (searched recursively)')
+    parser.add_argument('--participant', default=DEFAULT_PARTICIPANT)
+    parser.add_argument('--freq', default="1min", help='Time granularity of the merged series, e.g. 10s, 1min, 5min')
+    parser.add_argument('--hr-source', choices=["auto", "seconds", "1min"], default="auto",
+                        help='Heart rate files to use; auto prefers heartrate_seconds')
+    parser.add_argument('--users', type=int, default=N_SYNTHETIC_USERS)
+    args = parser.parse_args()
+    df = load_and_merge(args.participant, args.root, args.freq, args.hr_source)
+    make_synthetic_users(df, args.users)
     print("[Data] All synthetic user data generated.") 
\ No newline at end of file
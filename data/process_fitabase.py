@@ -0,0 +1,140 @@
+"""
+Process every participant of a Fitabase export in parallel.
+
+Discovery indexes the export tree by participant ID and date range, then a
+process pool merges each participant (data/fitabase.py) and writes
+user_<id>.npz to --out-dir (data/fitabase): one array per column, loadable by
+backend.utils.data_loader like the CSVs (--format csv writes user_<id>.csv
+instead). A JSON sidecar records each input file's size, mtime and SHA-256
+plus the merge options; participants whose inputs and options are unchanged
+are skipped. A touched but identical file is recognised by its hash.
+
+    python data/process_fitabase.py --root fitabaseexampledata --workers 8 --freq 1min
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from backend.utils.binary_cache import file_sha256
+from data.fitabase import FITABASE_ROOT, index_participants, load_participant
+from data.generate_fitabase_synthetic_users import engineer_features
+
+# Separate from data/processed so participants never mix with the placeholder users
+OUTPUT_DIR = "data/fitabase"
+INDEX_NAME = "fitabase_index.json"
+
+def output_paths(participant, out_dir, fmt="npz"):
+    base = os.path.join(out_dir, f"user_{participant}")
+    return f"{base}.{fmt}", f"{base}.meta.json"
+
+def _input_stats(entry):
+    stats = {}
+    for paths in entry['streams'].values():
+        for path in paths:
+            st = os.stat(path)
+            stats[path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    return stats
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, payload):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+def is_fresh(participant, entry, out_dir, options):
+    output_path, meta_path = output_paths(participant, out_dir, options['format'])
+    meta = _read_meta(meta_path)
+    if meta is None or meta.get('options') != options or not os.path.exists(output_path):
+        return False
+    recorded, current = meta.get('inputs', {}), _input_stats(entry)
+    if set(recorded) != set(current):
+        return False
+    touched = False
+    for path, stat in current.items():
+        if stat['size'] != recorded[path]['size']:
+            return False
+        if stat['mtime_ns'] != recorded[path]['mtime_ns']:
+            # Touched but possibly unchanged (e.g. a fresh copy of the export): fall back to the hash
+            if file_sha256(path) != recorded[path]['sha256']:
+                return False
+            recorded[path]['mtime_ns'] = stat['mtime_ns']
+            touched = True
+    if touched:
+        _write_json(meta_path, meta)
+    return True
+
+def write_columns(path, df):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **{column: df[column].to_numpy() for column in df.columns})
+    os.replace(tmp_path, path)
+
+def process_participant(participant, entry, out_dir, options):
+    """Merge one participant and write its output and sidecar; runs in a worker process."""
+    start = time.perf_counter()
+    output_path, meta_path = output_paths(participant, out_dir, options['format'])
+    inputs = _input_stats(entry)
+    for path in inputs:
+        inputs[path]['sha256'] = file_sha256(path)
+    # Per-participant seed so the simulated columns do not repeat across forked workers
+    rng = np.random.default_rng(zlib.crc32(participant.encode()))
+    df = engineer_features(load_participant(entry['streams'], options['freq'], options['hr_source']), rng)
+    if options['format'] == "npz":
+        write_columns(output_path, df)
+    else:
+        df.to_csv(output_path + ".tmp", index=False)
+        os.replace(output_path + ".tmp", output_path)
+    # Meta is written last so a crash mid-write leaves the participant stale
+    _write_json(meta_path, {'participant': participant, 'inputs': inputs, 'options': options, 'rows': len(df),
+                            'start': entry['start'], 'end': entry['end']})
+    return participant, len(df), time.perf_counter() - start
+
+def process_all(root=FITABASE_ROOT, out_dir=OUTPUT_DIR, workers=None, freq="1min", hr_source="auto",
+                fmt="npz", force=False):
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    index = index_participants(root)
+    _write_json(os.path.join(out_dir, INDEX_NAME), index)
+    options = {'freq': freq, 'hr_source': hr_source, 'format': fmt}
+    pending = {pid: entry for pid, entry in index.items() if force or not is_fresh(pid, entry, out_dir, options)}
+    print(f"[Data] {len(index)} participants under {root}, {len(index) - len(pending)} up to date, "
+          f"{len(pending)} to process")
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_participant, pid, entry, out_dir, options): pid for pid, entry in pending.items()}
+        for future in as_completed(futures):
+            try:
+                participant, rows, seconds = future.result()
+                print(f"[Data] user_{participant}.{fmt}: {rows} rows in {seconds:.1f}s")
+            except (OSError, ValueError, KeyError) as e:
+                failed.append(futures[future])
+                print(f"[Data] Participant {futures[future]} failed: {e}")
+    print(f"[Data] Processed {len(pending) - len(failed)} participants in {time.perf_counter() - start:.1f}s")
+    return len(pending) - len(failed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Process all Fitabase participants into per-user outputs.")
+    parser.add_argument('--root', default=FITABASE_ROOT, help='Fitabase export directory (searched recursively)')
+    parser.add_argument('--out-dir', default=OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--freq', default="1min", help='Time granularity of the merged series, e.g. 10s, 1min, 5min')
+    parser.add_argument('--hr-source', choices=["auto", "seconds", "1min"], default="auto")
+    parser.add_argument('--format', choices=["npz", "csv"], default="npz")
+    parser.add_argument('--force', action='store_true', help='Reprocess participants even if their inputs are unchanged')
+    args = parser.parse_args()
+    process_all(args.root, args.out_dir, args.workers, args.freq, args.hr_source, args.format, args.force)
+
+if __name__ == "__main__":
+    main()